@@ -1,53 +1,180 @@
 from langchain.agents import create_agent
 from langgraph.checkpoint.memory import InMemorySaver
-from .config import model, SYSTEM_PROMPT, selected_model
+from .config import (
+    tracer,
+    SYSTEM_PROMPT,
+    CHECKPOINTER_BACKEND,
+    CHECKPOINT_DB,
+    CHECKPOINT_KEEP_LAST,
+    CHECKPOINT_THREAD_TTL,
+    CHECKPOINT_BATCH_SIZE,
+    CONTEXT_MAX_TOKENS,
+    CONTEXT_KEEP_RECENT,
+    CONTEXT_TOOL_OUTPUT_TOKENS,
+    TOOL_RESULT_MAX_BYTES,
+    TOOL_WORKERS,
+    MAX_INFLIGHT_REQUESTS,
+    MODEL_MAX_ATTEMPTS,
+    HEDGE_REQUESTS,
+    MODEL_CALL_TIMEOUT,
+)
+from .context import ContextBudgetMiddleware
+from .models import ModelRouterMiddleware, ResilienceMiddleware, default_registry
+from .resilience import ResilientCaller, RetryPolicy
+from .spill import ToolOutputBudgetMiddleware
+from .parallel import ToolConcurrencyMiddleware
+from . import tools
 from .tools import (
     read_file, 
+    file_info,
     write_file, 
+    edit_file,
+    apply_patch,
     list_files, 
     make_dir, 
     delete_file, 
     delete_dir, 
     list_dir, 
+    read_files,
+    write_files,
+    make_dirs,
+    list_dirs,
+    tree,
+    glob_files,
+    grep_files,
     run_terminal_command,
+    start_job,
+    job_status,
+    job_output,
+    cancel_job,
+    read_spill,
     web_search,
+    web_search_batch,
     create_plan,
-    update_plan
+    update_plan,
+    update_plan_steps,
+    add_plan_steps,
+    get_plan_steps,
 )
 from .schema import Context, ResponseFormat
+from .tracing import instrument_tools
 
-# --- In-memory checkpoint for multi-step reasoning ---
-checkpointer = InMemorySaver()
+# --- Tools exposed to the agent (each one is traced) ---
+TOOLS = instrument_tools([
+    read_file,
+    file_info,
+    write_file,
+    edit_file,
+    apply_patch,
+    list_files,
+    make_dir,
+    delete_file,
+    delete_dir,
+    list_dir,
+    read_files,
+    write_files,
+    make_dirs,
+    list_dirs,
+    tree,
+    glob_files,
+    grep_files,
+    run_terminal_command,
+    start_job,
+    job_status,
+    job_output,
+    cancel_job,
+    read_spill,
+    web_search,
+    web_search_batch,
+    create_plan,
+    update_plan,
+    update_plan_steps,
+    add_plan_steps,
+    get_plan_steps,
+], tracer)
 
-def build_agent(system_prompt: str = SYSTEM_PROMPT):
+# --- Checkpointer for multi-step reasoning ---
+def make_checkpointer(backend: str = CHECKPOINTER_BACKEND):
+    """
+    Create the checkpointer selected by AGENTIC_CHECKPOINTER.
+    'sqlite' persists threads to disk with bounded retention; 'memory' is process-local.
+    """
+    if backend == "sqlite":
+        from .checkpoint import SqliteCheckpointSaver
+        return SqliteCheckpointSaver(
+            CHECKPOINT_DB,
+            keep_last=CHECKPOINT_KEEP_LAST,
+            thread_ttl=CHECKPOINT_THREAD_TTL or None,
+            batch_size=CHECKPOINT_BATCH_SIZE,
+        )
+    if backend == "memory":
+        from .checkpoint import make_serde
+        return InMemorySaver(serde=make_serde())
+    raise RuntimeError(f"Unsupported checkpointer backend: {backend}. Use 'memory' or 'sqlite'.")
+
+checkpointer = make_checkpointer()
+
+# --- Per-thread context budget (stats are read by the TUI) ---
+context_budget = ContextBudgetMiddleware(
+    max_tokens=CONTEXT_MAX_TOKENS,
+    keep_recent=CONTEXT_KEEP_RECENT,
+    tool_output_tokens=CONTEXT_TOOL_OUTPUT_TOKENS,
+)
+
+# --- Per-result cap on tool output; overflow goes to the spill store ---
+# Looked up on each call, so a swapped tools.spill_store (e.g. in benchmarks) is the one read_spill pages
+tool_budget = ToolOutputBudgetMiddleware(lambda: tools.spill_store, max_bytes=TOOL_RESULT_MAX_BYTES)
+
+# --- Tool calls from one step: bounded concurrency, same-path calls kept in order ---
+tool_concurrency = ToolConcurrencyMiddleware(max_workers=TOOL_WORKERS)
+
+# --- Model backends: primary plus optional fast tier / local endpoint ---
+model_registry = default_registry()
+
+# --- Retries, in-flight cap and hedging for every model call ---
+model_caller = ResilientCaller(
+    RetryPolicy(max_attempts=MODEL_MAX_ATTEMPTS),
+    max_concurrency=MAX_INFLIGHT_REQUESTS,
+    hedge=HEDGE_REQUESTS,
+    timeout=MODEL_CALL_TIMEOUT,
+)
+
+def release_thread(thread_id: str) -> None:
+    """Free what a finished thread holds: workspace, shell, jobs and its per-thread stats."""
+    tools.release_workspace(thread_id)
+    context_budget.forget(thread_id)
+    tool_budget.forget(thread_id)
+    tracer.forget(thread_id)
+
+def build_agent(system_prompt: str = SYSTEM_PROMPT, checkpointer=checkpointer, model=None):
     """
     Dynamically build an Agentic AI Developer with a given system prompt.
     Enables full tool support for Gemini and similar models.
+    Pass `model` to use any tool-calling chat model instead (e.g. a scripted fake for benchmarks).
+    With more than one registered backend, each model call is routed by tier and health.
     """
-    is_gemini = "gemini" in (selected_model or "").lower()
-
-    if is_gemini:
-        print("[AgenticAI] 🤖 Using Gemini with full tool support.")
-        return create_agent(
-            model=model,
-            tools=[
-                read_file, 
-                write_file, 
-                list_files, 
-                make_dir, 
-                delete_file, 
-                delete_dir, 
-                list_dir, 
-                run_terminal_command,
-                web_search,
-                create_plan,
-                update_plan
-            ],
-            system_prompt=system_prompt,
-            response_format=ResponseFormat,
-            context_schema=Context,
-            checkpointer=checkpointer,
-        )
+    if model is not None:
+        return _create(model, system_prompt, checkpointer)
+
+    primary = model_registry.specs[model_registry.primary()]
+    print(f"[AgenticAI] 🤖 Using {primary.model} with full tool support.")
+    model = model_registry.get(primary.name)
+    context_budget.summarizer = model
+    middleware = []
+    if len(model_registry.specs) > 1:
+        middleware.append(ModelRouterMiddleware(model_registry))
+        print(f"[AgenticAI] 🔀 Routing across {', '.join(model_registry.specs)}.")
+    # Innermost, so each backend is retried before the router falls back to the next
+    middleware.append(ResilienceMiddleware(model_caller))
+    return _create(model, system_prompt, checkpointer, middleware)
 
-    # ❌ Fallback for unsupported models
-    raise RuntimeError(f"Unsupported model type detected: {selected_model}. Please use Gemini or add a compatible handler.")
+def _create(model, system_prompt: str, checkpointer, middleware: list | None = None):
+    return create_agent(
+        model=model,
+        tools=TOOLS,
+        system_prompt=system_prompt,
+        response_format=ResponseFormat,
+        context_schema=Context,
+        checkpointer=checkpointer,
+        middleware=[context_budget, tool_concurrency, tool_budget, *(middleware or [])],
+    )
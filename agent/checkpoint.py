@@ -0,0 +1,382 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_active REAL NOT NULL
+);
+"""
+# Our own types stored in checkpoints (the structured response); allowed so they load without warnings
+ALLOWED_MSGPACK_MODULES = [("agent.schema", "ResponseFormat")]
+
+
+def make_serde() -> JsonPlusSerializer:
+    """The serializer every checkpointer here uses (SQLite and in-memory)."""
+    return JsonPlusSerializer(allowed_msgpack_modules=ALLOWED_MSGPACK_MODULES)
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """
+    Disk-backed LangGraph checkpointer using SQLite in WAL mode.
+
+    Checkpoints are buffered and written in batches (flushed on every read,
+    every `batch_size` puts, or on close). A retention policy keeps only the
+    last `keep_last` checkpoints per thread and drops threads idle for longer
+    than `thread_ttl` seconds, so the database stays bounded.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        keep_last: int = 20,
+        thread_ttl: float | None = 7 * 24 * 3600,
+        batch_size: int = 16,
+        *,
+        serde=None,
+    ):
+        super().__init__(serde=serde or make_serde())
+        self.path = str(path)
+        self.keep_last = keep_last
+        self.thread_ttl = thread_ttl
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending_checkpoints: list[tuple] = []
+        self._pending_writes: list[tuple] = []
+        # Writes to the special channels (errors, interrupts...) replace; regular writes never do
+        self._pending_replace_writes: list[tuple] = []
+        self._dirty_threads: set[str] = set()
+        self._last_expiry = 0.0
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # --- Batching ---
+    def flush(self) -> None:
+        """Write buffered checkpoints and writes to disk in one transaction."""
+        with self._lock:
+            if not self._pending_checkpoints and not self._pending_writes and not self._pending_replace_writes:
+                return
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_checkpoints,
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_replace_writes,
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_writes,
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO threads VALUES (?, ?)",
+                    [(thread_id, now) for thread_id in self._dirty_threads],
+                )
+                for thread_id in self._dirty_threads:
+                    self._apply_retention(thread_id)
+            self._pending_checkpoints.clear()
+            self._pending_writes.clear()
+            self._pending_replace_writes.clear()
+            self._dirty_threads.clear()
+            self.expire_idle_threads()
+
+    def _maybe_flush(self) -> None:
+        pending = len(self._pending_checkpoints) + len(self._pending_writes) + len(self._pending_replace_writes)
+        if pending >= self.batch_size:
+            self.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    # --- Retention ---
+    def _apply_retention(self, thread_id: str) -> None:
+        """Keep only the newest `keep_last` checkpoints of a thread."""
+        if not self.keep_last:
+            return
+        self.conn.execute(
+            """
+            DELETE FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints
+                WHERE thread_id = ?
+                ORDER BY checkpoint_id DESC LIMIT ?
+            )
+            """,
+            (thread_id, thread_id, self.keep_last),
+        )
+        self.conn.execute(
+            """
+            DELETE FROM writes
+            WHERE thread_id = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?
+            )
+            """,
+            (thread_id, thread_id),
+        )
+
+    def expire_idle_threads(self, force: bool = False) -> int:
+        """Delete threads idle longer than `thread_ttl`. Runs at most once a minute."""
+        if self.thread_ttl is None:
+            return 0
+        now = time.time()
+        if not force and now - self._last_expiry < 60:
+            return 0
+        self._last_expiry = now
+        cutoff = now - self.thread_ttl
+        with self._lock, self.conn:
+            expired = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_active < ?", (cutoff,)
+                )
+            ]
+            for thread_id in expired:
+                self._delete_thread_rows(thread_id)
+        return len(expired)
+
+    def _delete_thread_rows(self, thread_id: str) -> None:
+        self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        self.conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes for a thread."""
+        with self._lock:
+            self.flush()
+            with self.conn:
+                self._delete_thread_rows(thread_id)
+
+    # --- BaseCheckpointSaver API ---
+    def get_tuple(self, config) -> CheckpointTuple | None:
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            self.flush()
+            if checkpoint_id:
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._row_to_tuple(thread_id, checkpoint_ns, row)
+
+    def _row_to_tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, blob, metadata_type, metadata = row
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((w_type, value)))
+                for task_id, channel, w_type, value in writes
+            ],
+        )
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(str(config["configurable"]["thread_id"]))
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+        if before is not None:
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute(query, params).fetchall()
+
+        count = 0
+        for thread_id, checkpoint_ns, *rest in rows:
+            with self._lock:
+                item = self._row_to_tuple(thread_id, checkpoint_ns, rest)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                break
+
+    def put(
+        self,
+        config,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ):
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(dict(metadata))
+
+        with self._lock:
+            self._pending_checkpoints.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    type_,
+                    blob,
+                    metadata_type,
+                    metadata_blob,
+                    time.time(),
+                )
+            )
+            self._dirty_threads.add(thread_id)
+            self._maybe_flush()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config, writes, task_id: str, task_path: str = "") -> None:
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable["checkpoint_id"]
+
+        # Same rule as LangGraph's SqliteSaver: only the special channels may overwrite,
+        # so a replayed task cannot clobber writes that were already saved
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        pending = self._pending_replace_writes if replace else self._pending_writes
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                type_, blob = self.serde.dumps_typed(value)
+                pending.append(
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        task_path,
+                        WRITES_IDX_MAP.get(channel, idx),
+                        channel,
+                        type_,
+                        blob,
+                    )
+                )
+            self._dirty_threads.add(thread_id)
+            self._maybe_flush()
+
+    def get_next_version(self, current, channel=None) -> str:
+        # Same scheme as InMemorySaver: zero-padded, lexically sortable versions
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(str(current).split(".")[0])
+        return f"{current_v + 1:032}.0"
+
+    # --- Async API (delegates to the sync implementation in a thread) ---
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
@@ -1,52 +1,146 @@
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 # --- Step 1: Load Gemini API Key from .env ---
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 
-if not api_key:
-    raise RuntimeError(
-        "❌ GEMINI_API_KEY not found.\n"
-        "Please either set it using:\n"
-        "   export GEMINI_API_KEY='your_key_here'\n"
-        "or create a .env file in your project root with:\n"
-        "   GEMINI_API_KEY=your_key_here"
-    )
-
-# --- Step 2: Initialize Gemini Model ---
-try:
-    model = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-exp",
-        temperature=0.4,
-        max_output_tokens=1024,
-        google_api_key=api_key,  # ✅ explicitly use the loaded key
-    )
-    selected_model = "gemini-2.0-flash-exp"
-    print(f"[AgenticAI] ✅ Using Gemini model: {selected_model}")
-except Exception as e:
-    raise RuntimeError(f"❌ Could not initialize Gemini model.\n{e}")
-
-# --- Step 3: System Prompt ---
+# --- LLM response cache: "off", "on" (record + reuse) or "replay" (offline only) ---
+LLM_CACHE_MODE = os.getenv("AGENTIC_LLM_CACHE", "off").lower()
+LLM_CACHE_PATH = os.getenv("AGENTIC_LLM_CACHE_PATH", ".agentic_llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("AGENTIC_LLM_CACHE_MAX_ENTRIES", "5000"))
+
+if not api_key and LLM_CACHE_MODE == "replay":
+    # Replay never reaches the network, so any key will do
+    api_key = "replay-mode"
+
+# --- Tracing: spans for every model and tool call (set AGENTIC_TRACE_PATH for a JSONL export) ---
+from .tracing import Tracer
+TRACE_PATH = os.getenv("AGENTIC_TRACE_PATH")
+tracer = Tracer(TRACE_PATH)
+
+# --- Step 2: Chat models (built lazily on first use) ---
+selected_model = os.getenv("AGENTIC_MODEL", "gemini-2.0-flash-exp")
+# Optional fast tier for cheap turns (plan updates, listings), e.g. gemini-2.0-flash-lite
+FAST_MODEL = os.getenv("AGENTIC_FAST_MODEL")
+# Optional OpenAI-compatible local endpoint, e.g. http://localhost:11434/v1
+LOCAL_MODEL_URL = os.getenv("AGENTIC_LOCAL_MODEL_URL")
+LOCAL_MODEL_NAME = os.getenv("AGENTIC_LOCAL_MODEL_NAME", "local-model")
+LOCAL_MODEL_TIER = os.getenv("AGENTIC_LOCAL_MODEL_TIER", "fast")
+_llm_cache = None
+
+def get_llm_cache():
+    """The shared LLM response cache, or None when AGENTIC_LLM_CACHE is off."""
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE_MODE in ("on", "replay"):
+        from .llm_cache import DiskLLMCache
+        _llm_cache = DiskLLMCache(
+            LLM_CACHE_PATH,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            replay=LLM_CACHE_MODE == "replay",
+        )
+        print(f"[AgenticAI] 💾 LLM cache enabled ({LLM_CACHE_MODE}): {LLM_CACHE_PATH}")
+    return _llm_cache
+
+# --- Model client resilience (shared by every session in the process) ---
+MAX_INFLIGHT_REQUESTS = int(os.getenv("AGENTIC_MAX_INFLIGHT", "4"))
+MODEL_MAX_ATTEMPTS = int(os.getenv("AGENTIC_MODEL_MAX_ATTEMPTS", "5"))
+HEDGE_REQUESTS = os.getenv("AGENTIC_HEDGE", "off").lower() in ("1", "on", "true")
+# Seconds before a stalled model call is abandoned and retried (0 disables the deadline)
+MODEL_CALL_TIMEOUT = float(os.getenv("AGENTIC_MODEL_TIMEOUT", "120"))
+
+def make_chat_model(provider: str, model_name: str, base_url: str | None = None, **params):
+    """
+    Build a chat model for a provider ('gemini' or 'openai' for any OpenAI-compatible endpoint).
+    Every model shares the response cache and the tracer.
+    """
+    params = {"temperature": 0.4, **params}
+    if provider == "gemini":
+        if not api_key:
+            raise RuntimeError(
+                "❌ GEMINI_API_KEY not found.\n"
+                "Please either set it using:\n"
+                "   export GEMINI_API_KEY='your_key_here'\n"
+                "or create a .env file in your project root with:\n"
+                "   GEMINI_API_KEY=your_key_here"
+            )
+        try:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            return ChatGoogleGenerativeAI(
+                model=model_name,
+                max_output_tokens=params.pop("max_output_tokens", 1024),
+                google_api_key=api_key,  # ✅ explicitly use the loaded key
+                max_retries=1,  # Retries are handled by agent.resilience
+                cache=get_llm_cache(),
+                callbacks=[tracer],
+                **params,
+            )
+        except Exception as e:
+            raise RuntimeError(f"❌ Could not initialize Gemini model.\n{e}")
+    if provider == "openai":
+        try:
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(
+                model=model_name,
+                base_url=base_url,
+                api_key=os.getenv("AGENTIC_LOCAL_MODEL_KEY", "local"),
+                max_tokens=params.pop("max_output_tokens", 1024),
+                max_retries=0,  # Retries are handled by agent.resilience
+                cache=get_llm_cache(),
+                callbacks=[tracer],
+                **params,
+            )
+        except ImportError as e:
+            raise RuntimeError(f"❌ OpenAI-compatible backends need langchain-openai installed.\n{e}")
+    raise RuntimeError(f"Unsupported model provider: {provider}.")
+
+# --- Step 3: Checkpointer settings ---
+# "memory" keeps checkpoints in RAM (lost on restart); "sqlite" persists them to disk.
+CHECKPOINTER_BACKEND = os.getenv("AGENTIC_CHECKPOINTER", "memory").lower()
+CHECKPOINT_DB = os.getenv("AGENTIC_CHECKPOINT_DB", ".agentic_checkpoints.sqlite")
+CHECKPOINT_KEEP_LAST = int(os.getenv("AGENTIC_CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_THREAD_TTL = float(os.getenv("AGENTIC_CHECKPOINT_THREAD_TTL", str(7 * 24 * 3600)))
+CHECKPOINT_BATCH_SIZE = int(os.getenv("AGENTIC_CHECKPOINT_BATCH_SIZE", "16"))
+
+# --- Step 4: Context budget settings ---
+# History beyond this many (approximate) tokens is compacted before each model call.
+CONTEXT_MAX_TOKENS = int(os.getenv("AGENTIC_CONTEXT_MAX_TOKENS", "24000"))
+CONTEXT_KEEP_RECENT = int(os.getenv("AGENTIC_CONTEXT_KEEP_RECENT", "12"))
+CONTEXT_TOOL_OUTPUT_TOKENS = int(os.getenv("AGENTIC_CONTEXT_TOOL_OUTPUT_TOKENS", "1500"))
+# Tool results larger than this are spilled to disk and replaced by a preview plus a paging handle.
+TOOL_RESULT_MAX_BYTES = int(os.getenv("AGENTIC_TOOL_RESULT_MAX_BYTES", "16000"))
+# Tool calls from one model step run concurrently, at most this many at a time.
+TOOL_WORKERS = int(os.getenv("AGENTIC_TOOL_WORKERS", "8"))
+# Worker agents used by the plan orchestrator (/orchestrate, python -m agent.orchestrator).
+PLAN_WORKERS = int(os.getenv("AGENTIC_PLAN_WORKERS", "4"))
+
+# --- Step 5: System Prompt ---
 SYSTEM_PROMPT = """You are an elite Agentic AI Developer. Your goal is to be "perfect and precise" in software development.
 
 ### Core Operating Rules:
 1.  **Plan First**: Before writing any code, you MUST create a detailed plan/todo list in a file named `plan.md` or `todo.md`.
     *   Break down the task into small, sequential steps.
+    *   When a step needs earlier steps finished first, end it with `(after #1, #3)`; steps without
+        unfinished dependencies can be run in parallel by the orchestrator.
     *   Mark items as `[ ]` (pending) or `[x]` (done).
-2.  **Project Creation**: When asked to build something new, ALWAYS create a new directory for it using `make_dir`.
-3.  **Sequential Execution**: Follow your plan step-by-step.
-    *   Read the plan.
+2.  **Small Edits**: To change part of an existing file, use `edit_file` or `apply_patch` instead of rewriting it with `write_file`.
+3.  **Project Creation**: When asked to build something new, ALWAYS create a new directory for it using `make_dir`.
+    *   Prefer the batch tools (`write_files`, `read_files`, `make_dirs`, `list_dirs`) to handle many files in one call.
+4.  **Sequential Execution**: Follow your plan step-by-step.
+    *   Read the next step with `get_plan_steps` (next_pending=True).
     *   Execute the next step (e.g., create file, write code, run command).
-    *   Mark the step as done in the plan file.
+    *   Mark steps as done with `update_plan_steps`; mark several at once when you finished several.
     *   Repeat until finished.
-4.  **Terminal Access**: You have access to a terminal. Use it to:
+5.  **Terminal Access**: You have access to a terminal. Use it to:
     *   Create directories (`mkdir`).
     *   Install dependencies (`pip install`, `npm install`).
     *   Run tests.
+    *   The shell persists between commands: `cd`, `export` and `source venv/bin/activate` only need to run once.
+    *   For anything slow (installs, full test suites, dev servers) use `start_job`, keep working,
+        and check on it with `job_output`; stop it with `cancel_job`.
+    *   Large tool outputs are cut to a preview with a `spill:` handle; use `read_spill` to see the rest.
     *   **WARNING**: Be extremely careful with `rm` or destructive commands.
-5.  **Voice/Chat Persona**:
+6.  **Voice/Chat Persona**:
     *   Be concise and professional.
     *   Confirm when you are starting a plan.
     *   Report progress as you complete steps.
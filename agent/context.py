@@ -0,0 +1,222 @@
+import re
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.config import get_config
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+SUMMARY_PREFIX = "[Conversation summary]"
+# Per-call savings kept for display; older entries are dropped
+SAVED_HISTORY = 100
+# Threads whose stats are kept; the least recently used are dropped beyond this
+MAX_THREADS = 256
+PLAN_SNAPSHOT = re.compile(r"\n*Current plan \((.+?)\):\n.*\Z", re.DOTALL)
+PLAN_TOOLS = {"create_plan", "update_plan", "update_plan_steps", "add_plan_steps", "get_plan_steps"}
+
+SUMMARY_PROMPT = """Summarize the following conversation between a user and an AI developer agent.
+Keep: the user's goals, decisions made, files created or modified, commands run and their outcome,
+and any open problems. Be concise and factual.
+
+{conversation}
+"""
+
+
+@dataclass
+class ContextStats:
+    """Token accounting for one thread."""
+    model_calls: int = 0
+    compactions: int = 0
+    last_tokens_before: int = 0
+    last_tokens_after: int = 0
+    total_tokens_saved: int = 0
+    saved_per_call: deque[int] = field(default_factory=lambda: deque(maxlen=SAVED_HISTORY))
+
+    @property
+    def last_saved(self) -> int:
+        return self.last_tokens_before - self.last_tokens_after
+
+
+class ContextBudgetMiddleware(AgentMiddleware):
+    """
+    Keep each thread's message history under a token budget.
+
+    Before every model call the history is counted. Once it exceeds
+    `max_tokens`, large tool outputs are truncated first (those in the
+    recent window only past `recent_tool_output_tokens`); if that is not
+    enough, older turns are summarized (or dropped when no summarizer model
+    is given). The system prompt is passed separately by `create_agent` and
+    is never touched; the current state of the last plan the agent worked
+    on is carried into the summary message.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 24000,
+        keep_recent: int = 12,
+        tool_output_tokens: int = 1500,
+        recent_tool_output_tokens: int | None = None,
+        summarizer=None,
+        token_counter=count_tokens_approximately,
+    ):
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.tool_output_tokens = tool_output_tokens
+        self.recent_tool_output_tokens = recent_tool_output_tokens or tool_output_tokens * 4
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self.stats: OrderedDict[str, ContextStats] = OrderedDict()
+
+    def thread_stats(self, thread_id: str) -> ContextStats:
+        stats = self.stats.get(thread_id)
+        if stats is None:
+            stats = self.stats[thread_id] = ContextStats()
+            while len(self.stats) > MAX_THREADS:
+                self.stats.popitem(last=False)
+        else:
+            self.stats.move_to_end(thread_id)
+        return stats
+
+    def forget(self, thread_id: str) -> None:
+        """Drop a thread's stats (e.g. when its session expires)."""
+        self.stats.pop(thread_id, None)
+
+    def before_model(self, state, runtime) -> dict | None:
+        messages = list(state["messages"])
+        stats = self.thread_stats(current_thread_id())
+        stats.model_calls += 1
+
+        before = self.token_counter(messages)
+        stats.last_tokens_before = before
+        stats.last_tokens_after = before
+        if before <= self.max_tokens:
+            stats.saved_per_call.append(0)
+            return None
+
+        # Stage 1: truncate bulky tool outputs, with more room for recent ones
+        cutoff = max(len(messages) - self.keep_recent, 0)
+        truncated = []
+        for i, message in enumerate(messages):
+            if isinstance(message, ToolMessage) and message.name not in PLAN_TOOLS:
+                limit = self.tool_output_tokens if i < cutoff else self.recent_tool_output_tokens
+                shortened = self._truncate_tool_message(message, limit)
+                if shortened is not message:
+                    messages[i] = shortened
+                    truncated.append(shortened)
+
+        after = self.token_counter(messages)
+        if after <= self.max_tokens:
+            self._record(stats, before, after)
+            return {"messages": truncated} if truncated else None
+
+        # Stage 2: replace older turns with a summary
+        cutoff = _safe_cutoff(messages, cutoff)
+        # Re-summarizing a lone summary saves nothing and would repeat on every step
+        if cutoff <= 0 or all(_is_summary(m) for m in messages[:cutoff]):
+            self._record(stats, before, after)
+            return {"messages": truncated} if truncated else None
+
+        old, recent = messages[:cutoff], messages[cutoff:]
+        summary = HumanMessage(content=self._summarize(old))
+        compacted = [summary, *recent]
+        self._record(stats, before, self.token_counter(compacted))
+        stats.compactions += 1
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted]}
+
+    def _record(self, stats: ContextStats, before: int, after: int) -> None:
+        stats.last_tokens_after = after
+        stats.total_tokens_saved += before - after
+        stats.saved_per_call.append(before - after)
+
+    def _truncate_tool_message(self, message: ToolMessage, limit: int) -> ToolMessage:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if self.token_counter([message]) <= limit:
+            return message
+        # Roughly 4 characters per token
+        keep_chars = limit * 4
+        head = content[: keep_chars // 2]
+        tail = content[-keep_chars // 4:]
+        dropped = len(content) - len(head) - len(tail)
+        return message.model_copy(
+            update={"content": f"{head}\n[... {dropped} characters truncated ...]\n{tail}"}
+        )
+
+    def _summarize(self, old_messages) -> str:
+        previous = ""
+        plan_name = plan_result = ""
+        lines = []
+        for message in old_messages:
+            content = message.content if isinstance(message.content, str) else str(message.content)
+            if _is_summary(message):
+                previous = content[len(SUMMARY_PREFIX):].strip()
+                # The plan is re-read below, so an earlier snapshot is dropped rather than summarized
+                match = PLAN_SNAPSHOT.search(previous)
+                if match:
+                    plan_name, previous = match.group(1), previous[:match.start()].strip()
+                continue
+            if isinstance(message, ToolMessage):
+                if message.name in PLAN_TOOLS:
+                    plan_result = content
+                lines.append(f"tool {message.name}: {content[:500]}")
+            elif isinstance(message, AIMessage):
+                for call in message.tool_calls or []:
+                    if call.get("name") in PLAN_TOOLS and (call.get("args") or {}).get("plan_name"):
+                        plan_name = call["args"]["plan_name"]
+                calls = ", ".join(c.get("name", "?") for c in message.tool_calls or [])
+                lines.append(f"assistant: {content}" + (f" [calls: {calls}]" if calls else ""))
+            else:
+                lines.append(f"{message.type}: {content}")
+
+        if self.summarizer is not None:
+            conversation = "\n".join(([f"previous summary: {previous}"] if previous else []) + lines)
+            try:
+                result = self.summarizer.invoke(SUMMARY_PROMPT.format(conversation=conversation))
+                body = result.content if isinstance(result.content, str) else str(result.content)
+            except Exception as e:
+                body = f"{previous}\n(Older turns dropped; summarization failed: {e})".strip()
+        else:
+            body = f"{previous}\n(Older turns dropped to stay within the context budget.)".strip()
+
+        plan = _current_plan(plan_name) if plan_name else None
+        if plan:
+            body += f"\n\nCurrent plan ({plan_name}):\n{plan}"
+        elif plan_result:
+            body += f"\n\nLatest plan update: {plan_result}"
+        return f"{SUMMARY_PREFIX}\n{body}"
+
+
+def _current_plan(plan_name: str) -> str | None:
+    """The plan's steps as they are now on disk, or None if it cannot be read."""
+    from .plans import Plan, format_steps
+    from .tools import resolve_path
+
+    try:
+        return format_steps(Plan.load(resolve_path(plan_name)).steps)
+    except (ValueError, OSError):
+        return None
+
+
+def current_thread_id() -> str:
+    try:
+        return str(get_config()["configurable"].get("thread_id", "default"))
+    except Exception:
+        return "default"
+
+
+def _is_summary(message) -> bool:
+    return isinstance(message, HumanMessage) and isinstance(message.content, str) and message.content.startswith(SUMMARY_PREFIX)
+
+
+def _safe_cutoff(messages, cutoff: int) -> int:
+    """Move the cutoff back so kept messages never start with orphaned tool results."""
+    while cutoff > 0 and isinstance(messages[cutoff], ToolMessage):
+        cutoff -= 1
+    return cutoff
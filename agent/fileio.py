@@ -0,0 +1,124 @@
+import codecs
+import mmap
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20  # 1 MiB
+SNIFF_SIZE = 64 * 1024
+MAX_FULL_READ = 256 * 1024  # files larger than this are never returned whole
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Best-effort encoding guess from the first bytes of a file."""
+    for bom, name in BOMS:
+        if sample.startswith(bom):
+            return name
+    if b"\x00" in sample:
+        return "binary"
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still utf-8
+        if e.start >= len(sample) - 3:
+            return "utf-8"
+        return "latin-1"
+
+
+def _open_map(path: Path):
+    """Return (file, mmap) for a non-empty file, or (file, None) for an empty one."""
+    f = open(path, "rb")
+    if path.stat().st_size == 0:
+        return f, None
+    return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def file_info(path: Path) -> dict:
+    """Size, line count and encoding, computed in constant memory."""
+    size = path.stat().st_size
+    lines = 0
+    last = b""
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_SIZE)
+        f.seek(0)
+        while chunk := f.read(CHUNK_SIZE):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if size and last != b"\n":
+        lines += 1
+    return {"size": size, "lines": lines, "encoding": detect_encoding(sample)}
+
+
+def decode(data: bytes, encoding: str) -> str:
+    if encoding == "binary":
+        encoding = "latin-1"
+    return data.decode(encoding, errors="replace")
+
+
+def read_bytes(path: Path, offset: int, length: int) -> bytes:
+    """Read `length` bytes at `offset` through mmap; only the slice is paged in."""
+    f, mm = _open_map(path)
+    try:
+        if mm is None:
+            return b""
+        return mm[max(offset, 0): max(offset, 0) + max(length, 0)]
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
+
+
+def read_lines(path: Path, start: int, end: int | None) -> bytes:
+    """Return lines [start, end) (0-based, end exclusive) by scanning newlines in the mmap."""
+    f, mm = _open_map(path)
+    try:
+        if mm is None:
+            return b""
+        pos = 0
+        for _ in range(start):
+            nl = mm.find(b"\n", pos)
+            if nl == -1:
+                return b""
+            pos = nl + 1
+        if end is None:
+            return mm[pos:]
+        stop = pos
+        for _ in range(max(end - start, 0)):
+            nl = mm.find(b"\n", stop)
+            if nl == -1:
+                stop = len(mm)
+                break
+            stop = nl + 1
+        return mm[pos:stop]
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
+
+
+def read_tail(path: Path, count: int) -> bytes:
+    """Return the last `count` lines by searching backwards from the end of the mmap."""
+    f, mm = _open_map(path)
+    try:
+        if mm is None or count <= 0:
+            return b""
+        end = len(mm)
+        # Ignore a trailing newline so it doesn't count as an empty last line
+        pos = end - 1 if mm[end - 1:end] == b"\n" else end
+        for _ in range(count):
+            nl = mm.rfind(b"\n", 0, pos)
+            if nl == -1:
+                return mm[:end]
+            pos = nl
+        return mm[pos + 1:end]
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
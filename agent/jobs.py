@@ -0,0 +1,246 @@
+import itertools
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+class JobError(Exception):
+    pass
+
+
+class RotatingLog:
+    """
+    Append-only log split into fixed-size segment files.
+
+    Offsets are absolute byte positions in the whole stream, so a reader's
+    cursor stays valid across rotations. Only the newest `keep` segments are
+    retained; reading from an offset that has been rotated away resumes at
+    the oldest retained byte.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 1 << 20, keep: int = 4):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.size = 0
+        self.segments: list[tuple[int, Path]] = []  # (start offset, file)
+        self._file = None
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            while data:
+                if self._file is None or self.size - self.segments[-1][0] >= self.max_bytes:
+                    self._rotate()
+                room = self.max_bytes - (self.size - self.segments[-1][0])
+                chunk, data = data[:room], data[room:]
+                self._file.write(chunk)
+                self._file.flush()
+                self.size += len(chunk)
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = self.directory / f"output.{len(self.segments)}.log"
+        self.segments.append((self.size, path))
+        self._file = open(path, "wb")
+        while len(self.segments) > self.keep:
+            _, old = self.segments.pop(0)
+            old.unlink(missing_ok=True)
+
+    @property
+    def first_offset(self) -> int:
+        return self.segments[0][0] if self.segments else 0
+
+    def read(self, offset: int, max_bytes: int) -> tuple[bytes, int]:
+        """Bytes from `offset` (clamped to what is retained) and the offset to read from next."""
+        with self._lock:
+            segments = list(self.segments)
+            size = self.size
+        offset = min(max(offset, segments[0][0] if segments else 0), size)
+        out = bytearray()
+        for i, (start, path) in enumerate(segments):
+            end = segments[i + 1][0] if i + 1 < len(segments) else size
+            if end <= offset or len(out) >= max_bytes:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    f.seek(max(offset, start) - start)
+                    out += f.read(min(end - max(offset, start), max_bytes - len(out)))
+            except FileNotFoundError:
+                continue  # Rotated away while reading
+        return bytes(out), offset + len(out)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+@dataclass
+class Job:
+    id: str
+    owner: str
+    command: str
+    cwd: str
+    proc: subprocess.Popen
+    log: RotatingLog
+    started: float = field(default_factory=time.time)
+    ended: float | None = None
+    state: str = "running"  # running, exited, failed or cancelled
+    exit_code: int | None = None
+
+    def summary(self) -> str:
+        runtime = (self.ended or time.time()) - self.started
+        code = f", exit code {self.exit_code}" if self.exit_code is not None else ""
+        return f"{self.id} [{self.state}{code}] {runtime:.0f}s, {self.log.size} bytes of output: {self.command}"
+
+
+class JobManager:
+    """
+    Runs commands in the background, one process group per job.
+
+    Output (stdout and stderr merged) is pumped into a RotatingLog, so the
+    agent can keep working and read it later with an offset cursor. Each
+    owner (agent thread) may run at most `max_per_owner` jobs at a time;
+    finished jobs beyond `keep_finished` per owner are forgotten and their
+    logs deleted.
+    """
+
+    def __init__(
+        self,
+        log_root: Path,
+        max_per_owner: int = 4,
+        keep_finished: int = 20,
+        log_bytes: int = 1 << 20,
+        log_segments: int = 4,
+    ):
+        self.log_root = Path(log_root)
+        self.max_per_owner = max_per_owner
+        self.keep_finished = keep_finished
+        self.log_bytes = log_bytes
+        self.log_segments = log_segments
+        self.jobs: dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def start(self, owner: str, command: str, cwd: str) -> Job:
+        with self._lock:
+            running = [j for j in self.jobs.values() if j.owner == owner and j.state == "running"]
+            if len(running) >= self.max_per_owner:
+                raise JobError(
+                    f"{len(running)} jobs already running (limit {self.max_per_owner}); "
+                    "wait for one to finish or cancel one."
+                )
+            job_id = f"job-{next(self._ids)}"
+        log = RotatingLog(self.log_root / job_id, self.log_bytes, self.log_segments)
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        job = Job(job_id, owner, command, cwd, proc, log)
+        with self._lock:
+            self.jobs[job_id] = job
+            self._prune(owner)
+        threading.Thread(target=self._pump, args=(job,), daemon=True, name=job_id).start()
+        return job
+
+    def _pump(self, job: Job) -> None:
+        fd = job.proc.stdout.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b""
+            if not chunk:
+                break
+            job.log.write(chunk)
+            with self._changed:
+                self._changed.notify_all()
+        code = job.proc.wait()
+        job.proc.stdout.close()
+        job.log.close()
+        with self._changed:
+            job.exit_code = code
+            job.ended = time.time()
+            if job.state == "running":
+                job.state = "exited" if code == 0 else "failed"
+            self._changed.notify_all()
+
+    def get(self, owner: str, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None or job.owner != owner:
+            raise JobError(f"No job {job_id}.")
+        return job
+
+    def list(self, owner: str) -> list[Job]:
+        with self._lock:
+            return [j for j in self.jobs.values() if j.owner == owner]
+
+    def read(self, owner: str, job_id: str, offset: int = 0, max_bytes: int = 8000, wait: float = 0.0):
+        """
+        Output from `offset`; a negative offset reads the last `-offset` bytes.
+        With `wait`, blocks up to that many seconds for new output or exit.
+        Returns (job, text, next_offset, skipped_bytes).
+        """
+        job = self.get(owner, job_id)
+        if offset < 0:
+            offset = max(job.log.size + offset, 0)
+        deadline = time.monotonic() + wait
+        with self._changed:
+            while job.log.size <= offset and job.state == "running":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+        skipped = max(job.log.first_offset - offset, 0)
+        data, next_offset = job.log.read(offset, max_bytes)
+        return job, data.decode(errors="replace"), next_offset, skipped
+
+    def cancel(self, owner: str, job_id: str, grace: float = 3.0) -> Job:
+        job = self.get(owner, job_id)
+        if job.state != "running":
+            return job
+        job.state = "cancelled"
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(job.proc.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                job.proc.wait(timeout=grace)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+        return job
+
+    def _prune(self, owner: str) -> None:
+        finished = [j for j in self.jobs.values() if j.owner == owner and j.state != "running"]
+        for job in finished[: max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job.id]
+            shutil.rmtree(job.log.directory, ignore_errors=True)
+
+    def cancel_owner(self, owner: str, grace: float = 1.0) -> None:
+        """Cancel every running job of one owner, e.g. when its agent thread is released."""
+        with self._lock:
+            running = [j for j in self.jobs.values() if j.owner == owner and j.state == "running"]
+        for job in running:
+            self.cancel(owner, job.id, grace=grace)
+
+    def close_all(self) -> None:
+        for job in list(self.jobs.values()):
+            if job.state == "running":
+                self.cancel(job.owner, job.id, grace=1.0)
@@ -0,0 +1,116 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    llm_string TEXT NOT NULL,
+    generations TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (last_access);
+"""
+
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class DiskLLMCache(BaseCache):
+    """
+    Size-capped, disk-backed LangChain cache with LRU eviction.
+
+    LangChain keys the cache on the serialized messages (system prompt
+    included) plus the model's `llm_string` (model name, temperature and
+    bound tool schemas), so a hit means an identical request.
+
+    In `replay` mode a miss raises ReplayMissError instead of letting the
+    model call the network, so recorded sessions run fully offline.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 5000, replay: bool = False):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT generations FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.replay:
+                    raise ReplayMissError(
+                        f"Replay mode: no recorded response for request {key[:12]}."
+                    )
+                return None
+            self.hits += 1
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        if self.replay:
+            return
+        payload = dumps(list(return_val))
+        key = self._key(prompt, llm_string)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, payload, len(payload), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries beyond `max_entries`."""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def clear(self, **kwargs) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
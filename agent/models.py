@@ -0,0 +1,235 @@
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables.config import var_child_runnable_config
+
+# Turns that only follow up on these tools are cheap enough for the fast tier
+CHEAP_TOOLS = {
+    "list_files", "list_dir", "list_dirs", "tree", "glob_files", "file_info",
+    "make_dir", "make_dirs", "create_plan", "update_plan", "update_plan_steps",
+    "add_plan_steps", "get_plan_steps",
+}
+TIERS = ("fast", "strong")
+PROVIDERS = ("gemini", "openai")
+
+
+@dataclass
+class ModelSpec:
+    """One backend in the registry."""
+    name: str
+    provider: str  # "gemini" or "openai" (any OpenAI-compatible endpoint)
+    model: str
+    tier: str = "strong"
+    base_url: str | None = None
+    params: dict = field(default_factory=dict)
+
+
+class BackendStats:
+    """Rolling latency and error statistics for one backend."""
+
+    def __init__(self, window: int = 50, cooldown: float = 30.0):
+        self.samples: deque[tuple[float, bool]] = deque(maxlen=window)
+        self.cooldown = cooldown
+        self.last_failure = 0.0
+        self.consecutive_failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.samples.append((latency, ok))
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+                self.last_failure = time.monotonic()
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def p50(self) -> float | None:
+        with self._lock:
+            latencies = [lat for lat, ok in self.samples if ok]
+        return statistics.median(latencies) if latencies else None
+
+    def healthy(self) -> bool:
+        """Unhealthy after repeated failures, until the cooldown has passed."""
+        recently_failed = time.monotonic() - self.last_failure < self.cooldown
+        if self.consecutive_failures >= 3 and recently_failed:
+            return False
+        return not (len(self.samples) >= 5 and self.error_rate > 0.5 and recently_failed)
+
+
+class ModelRegistry:
+    """Holds model backends, builds them lazily and tracks their health."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.specs: dict[str, ModelSpec] = {}
+        self.stats: dict[str, BackendStats] = {}
+        self._models: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec: ModelSpec, model=None) -> None:
+        """Add a backend; pass `model` to use a pre-built chat model instead of the factory."""
+        if spec.tier not in TIERS:
+            raise ValueError(f"Unknown tier {spec.tier!r}; use one of {', '.join(TIERS)}.")
+        if model is None and spec.provider not in PROVIDERS:
+            raise ValueError(f"Unsupported provider {spec.provider!r} for {spec.model}; use one of {', '.join(PROVIDERS)}.")
+        self.specs[spec.name] = spec
+        self.stats.setdefault(spec.name, BackendStats())
+        if model is not None:
+            self._models[spec.name] = model
+
+    def get(self, name: str):
+        with self._lock:
+            if name not in self._models:
+                spec = self.specs[name]
+                self._models[name] = self.factory(spec.provider, spec.model, base_url=spec.base_url, **spec.params)
+            return self._models[name]
+
+    def candidates(self, tier: str) -> list[str]:
+        """Backends to try for a tier: healthy ones of that tier by latency, then the rest as fallback."""
+        def order(name):
+            p50 = self.stats[name].p50
+            return (not self.stats[name].healthy(), p50 if p50 is not None else 0.0)
+
+        preferred = sorted((n for n, s in self.specs.items() if s.tier == tier), key=order)
+        others = sorted((n for n, s in self.specs.items() if s.tier != tier), key=order)
+        return preferred + others
+
+    def primary(self) -> str:
+        return self.candidates("strong")[0]
+
+    def summary(self) -> dict:
+        return {
+            name: {
+                "tier": spec.tier,
+                "model": spec.model,
+                "p50_s": self.stats[name].p50,
+                "error_rate": self.stats[name].error_rate,
+                "healthy": self.stats[name].healthy(),
+            }
+            for name, spec in self.specs.items()
+        }
+
+
+def classify_turn(messages) -> str:
+    """'fast' when the model is only reacting to cheap tool results, otherwise 'strong'."""
+    if not messages or not isinstance(messages[-1], ToolMessage):
+        return "strong"
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            calls = message.tool_calls or []
+            return "fast" if calls and all(c.get("name") in CHEAP_TOOLS for c in calls) else "strong"
+    return "strong"
+
+
+class ModelRouterMiddleware(AgentMiddleware):
+    """
+    Route each model call to a backend from the registry.
+
+    Cheap follow-ups go to the fast tier, everything else to the strong
+    tier. When a backend raises, the next candidate is tried; unhealthy
+    backends sink to the end of the list until their cooldown passes.
+    """
+
+    def __init__(self, registry: ModelRegistry):
+        super().__init__()
+        self.registry = registry
+        self.routed: dict[str, int] = {}
+
+    def wrap_model_call(self, request, handler):
+        tier = classify_turn(request.messages)
+        last_error = None
+        for name in self.registry.candidates(tier):
+            stats = self.registry.stats[name]
+            started = time.perf_counter()
+            try:
+                response = handler(request.override(model=self.registry.get(name)))
+            except Exception as e:
+                stats.record(time.perf_counter() - started, ok=False)
+                last_error = e
+                continue
+            stats.record(time.perf_counter() - started, ok=True)
+            self.routed[name] = self.routed.get(name, 0) + 1
+            return response
+        raise last_error or RuntimeError("No model backends are registered.")
+
+
+class ResilienceMiddleware(AgentMiddleware):
+    """
+    Runs every model call through a shared ResilientCaller (retries, concurrency cap, hedging).
+
+    Streamed tokens cannot be taken back, so streamed calls are never
+    hedged. The hedge runs on a copy of the model without its constructor
+    callbacks (the tracer) and with no run callbacks, so tracers and token
+    counters see one span per model call; the hedge is counted in
+    `caller.hedges` instead.
+    """
+
+    def __init__(self, caller):
+        super().__init__()
+        self.caller = caller
+
+    def wrap_model_call(self, request, handler):
+        call = lambda: handler(request)
+        hedge = None
+        if not _is_streaming():
+            hedge = lambda: _without_callbacks(lambda: handler(request.override(model=_quiet(request.model))))
+        return self.caller.call(call, hedge_fn=hedge)
+
+
+def _is_streaming() -> bool:
+    """True when the current run streams model tokens to the caller (stream_mode="messages")."""
+    callbacks = (var_child_runnable_config.get() or {}).get("callbacks")
+    handlers = callbacks if isinstance(callbacks, list) else getattr(callbacks, "handlers", None) or []
+    return any(type(h).__name__ == "StreamMessagesHandler" for h in handlers)
+
+
+def _quiet(model):
+    """The model without callbacks attached at construction (e.g. config.tracer)."""
+    if getattr(model, "callbacks", None) and hasattr(model, "model_copy"):
+        return model.model_copy(update={"callbacks": None})
+    return model
+
+
+def _without_callbacks(fn):
+    config = var_child_runnable_config.get() or {}
+    token = var_child_runnable_config.set({**config, "callbacks": None})
+    try:
+        return fn()
+    finally:
+        var_child_runnable_config.reset(token)
+
+
+def default_registry() -> ModelRegistry:
+    """Registry built from AGENTIC_MODEL, AGENTIC_FAST_MODEL and AGENTIC_LOCAL_MODEL_* settings."""
+    from .config import (
+        FAST_MODEL,
+        LOCAL_MODEL_NAME,
+        LOCAL_MODEL_TIER,
+        LOCAL_MODEL_URL,
+        make_chat_model,
+        selected_model,
+    )
+
+    registry = ModelRegistry(make_chat_model)
+    provider = "gemini" if "gemini" in selected_model.lower() else "openai"
+    registry.register(ModelSpec("primary", provider, selected_model, tier="strong",
+                                base_url=None if provider == "gemini" else LOCAL_MODEL_URL))
+    if FAST_MODEL:
+        registry.register(ModelSpec("fast", "gemini", FAST_MODEL, tier="fast"))
+    if LOCAL_MODEL_URL and provider == "gemini":
+        registry.register(ModelSpec("local", "openai", LOCAL_MODEL_NAME, tier=LOCAL_MODEL_TIER,
+                                    base_url=LOCAL_MODEL_URL))
+    return registry
@@ -0,0 +1,189 @@
+"""
+Run the independent steps of a plan on several worker agents at once.
+
+Steps declare dependencies with "(after #1, #3)"; every pending step whose
+dependencies are done is handed to a worker, each on its own checkpointer
+thread, and its outcome is merged back into the plan.
+
+    python -m agent.orchestrator plan.md --workers 4
+"""
+import argparse
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import PLAN_WORKERS, SYSTEM_PROMPT
+from .plans import Plan, PlanError, edit_plan
+from .schema import Context
+
+WORKER_PROMPT = SYSTEM_PROMPT + """
+### Worker Mode (overrides the rules above where they conflict):
+*   You are one of several workers executing a shared plan in parallel.
+*   Do ONLY the step you are given. Do not create, edit or update any plan file; progress is tracked for you.
+*   Other workers are changing other files at the same time: only touch the files your step needs.
+*   Finish with a short summary of what you did and which files you changed.
+"""
+
+
+@dataclass
+class StepOutcome:
+    step_id: str
+    ok: bool
+    summary: str
+    seconds: float
+    thread_id: str
+
+
+@dataclass
+class OrchestratorReport:
+    wall: float = 0.0
+    outcomes: list[StepOutcome] = field(default_factory=list)
+    blocked: list[str] = field(default_factory=list)
+
+    @property
+    def busy(self) -> float:
+        return sum(o.seconds for o in self.outcomes)
+
+    @property
+    def parallelism(self) -> float:
+        """Worker-seconds per wall-second; 1.0 means the steps effectively ran one by one."""
+        return self.busy / self.wall if self.wall else 0.0
+
+    def format(self) -> str:
+        done = sum(1 for o in self.outcomes if o.ok)
+        lines = [
+            f"Ran {len(self.outcomes)} step attempt(s) in {self.wall:.1f}s wall "
+            f"({self.busy:.1f}s of worker time, parallelism {self.parallelism:.1f}x); {done} done."
+        ]
+        for o in self.outcomes:
+            lines.append(f"  #{o.step_id} {'done' if o.ok else 'FAILED'} in {o.seconds:.1f}s: {o.summary.splitlines()[0] if o.summary else ''}")
+        if self.blocked:
+            lines.append(f"  Not run (failed or blocked dependencies): {', '.join('#' + s for s in self.blocked)}")
+        return "\n".join(lines)
+
+
+class Orchestrator:
+    """
+    Schedules ready plan steps onto a pool of worker agent threads.
+
+    `agent` is a compiled agent (e.g. `build_agent(WORKER_PROMPT)`); one
+    instance serves every worker, since each step runs on its own
+    `thread_id`. Writes from concurrent workers are serialized per path by
+    the tool middleware, and only the orchestrator edits the plan.
+    """
+
+    def __init__(
+        self,
+        agent,
+        plan_path: Path,
+        workers: int = PLAN_WORKERS,
+        thread_prefix: str = "orchestrator",
+        context: Context | None = None,
+        max_attempts: int = 2,
+        recursion_limit: int = 150,
+        on_event=None,
+    ):
+        self.agent = agent
+        self.plan_path = Path(plan_path)
+        self.workers = workers
+        self.thread_prefix = thread_prefix
+        self.context = context or Context(user_id="orchestrator")
+        self.max_attempts = max_attempts
+        self.recursion_limit = recursion_limit
+        self.on_event = on_event or (lambda message: None)
+        self.attempts: dict[str, int] = {}
+
+    def run(self) -> OrchestratorReport:
+        report = OrchestratorReport()
+        started = time.perf_counter()
+        # Steps left in progress by an interrupted run are picked up again
+        plan, _ = edit_plan(self.plan_path, lambda p: [s.update(status="pending") for s in p.filter("in_progress")])
+        overview = "\n".join(f"#{s['id']} {s['text']}" for s in plan.steps)
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="plan-worker") as pool:
+            while True:
+                plan = Plan.load(self.plan_path)
+                busy = set(running.values())
+                ready = [
+                    s for s in plan.ready()
+                    if s["id"] not in busy and self.attempts.get(s["id"], 0) < self.max_attempts
+                ]
+                launch = ready[: self.workers - len(running)]
+                if launch:
+                    edit_plan(self.plan_path, lambda p: p.set_status([s["id"] for s in launch], "in_progress"))
+                for step in launch:
+                    self.attempts[step["id"]] = self.attempts.get(step["id"], 0) + 1
+                    self.on_event(f"▶ #{step['id']} {step['text']}")
+                    running[pool.submit(self._run_step, step, overview)] = step["id"]
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    running.pop(future)
+                    outcome = future.result()
+                    report.outcomes.append(outcome)
+                    self._merge(outcome)
+
+        report.wall = time.perf_counter() - started
+        report.blocked = [s["id"] for s in Plan.load(self.plan_path).filter("pending")]
+        return report
+
+    def _run_step(self, step: dict, overview: str) -> StepOutcome:
+        from .ai_agent import release_thread
+
+        thread_id = f"{self.thread_prefix}-step-{step['id']}-{self.attempts[step['id']]}"
+        prompt = (
+            f"Overall plan ({self.plan_path.name}):\n{overview}\n\n"
+            f"Your step: #{step['id']} {step['text']}"
+        )
+        started = time.perf_counter()
+        try:
+            response = self.agent.invoke(
+                {"messages": [{"role": "user", "content": prompt}]},
+                config={"configurable": {"thread_id": thread_id}, "recursion_limit": self.recursion_limit},
+                context=self.context,
+            )
+            reply = response.get("structured_response") or response["messages"][-1].content
+            return StepOutcome(step["id"], True, str(reply).strip(), time.perf_counter() - started, thread_id)
+        except Exception as e:
+            return StepOutcome(step["id"], False, f"{type(e).__name__}: {e}", time.perf_counter() - started, thread_id)
+        finally:
+            # The step's thread is never resumed: close its shell, stop its background jobs, drop its stats
+            release_thread(thread_id)
+
+    def _merge(self, outcome: StepOutcome) -> None:
+        if outcome.ok:
+            edit_plan(self.plan_path, lambda p: p.set_result(outcome.step_id, "done", outcome.summary))
+            self.on_event(f"✔ #{outcome.step_id} done in {outcome.seconds:.1f}s")
+        else:
+            # Back to pending so a retry (or a later run) can pick it up
+            edit_plan(self.plan_path, lambda p: p.set_result(outcome.step_id, "pending", f"Failed: {outcome.summary}"))
+            self.on_event(f"✖ #{outcome.step_id} failed: {outcome.summary}")
+
+
+def run_plan(plan_path: Path, workers: int = PLAN_WORKERS, on_event=None) -> OrchestratorReport:
+    """Build a worker agent and run every ready step of `plan_path`."""
+    from .ai_agent import build_agent
+
+    return Orchestrator(build_agent(system_prompt=WORKER_PROMPT), plan_path, workers, on_event=on_event).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("plan", help="plan file relative to the project directory, e.g. app/plan.md")
+    parser.add_argument("--workers", type=int, default=PLAN_WORKERS)
+    args = parser.parse_args()
+
+    from .tools import resolve_path
+    try:
+        report = run_plan(resolve_path(args.plan), args.workers, on_event=print)
+    except (PlanError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import contextlib
+import os
+import threading
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage
+
+# Which tool arguments name paths, and whether the tool reads or writes them
+READ_ARGS = {
+    "read_file": ("file_name",),
+    "file_info": ("file_name",),
+    "read_files": ("file_names",),
+    "list_dir": ("dir_name",),
+    "list_dirs": ("dir_names",),
+    "tree": ("dir_name",),
+    "get_plan_steps": ("plan_name",),
+}
+WRITE_ARGS = {
+    "write_file": ("file_name",),
+    "edit_file": ("file_name",),
+    "apply_patch": ("file_name",),
+    "delete_file": ("file_name",),
+    "append_to_file": ("file_name",),
+    "make_dir": ("dir_name",),
+    "delete_dir": ("dir_name",),
+    "write_files": ("file_names",),
+    "make_dirs": ("dir_names",),
+    "create_plan": ("plan_name",),
+    "update_plan": ("plan_name",),
+    "update_plan_steps": ("plan_name",),
+    "add_plan_steps": ("plan_name",),
+}
+# Searches and listings of the whole workspace read its root
+WORKSPACE_ROOT = "."
+READ_WORKSPACE = {"list_files", "glob_files", "grep_files"}
+# Commands can touch any file, so they are ordered against every read and write
+EVERYTHING = "*"
+WRITE_ANYTHING = {"run_terminal_command", "start_job"}
+
+
+def accesses(call: dict) -> list[tuple[str, bool]]:
+    """(path, is_write) pairs a tool call touches; empty for calls that touch no files."""
+    name, args = call.get("name"), call.get("args") or {}
+    if name in WRITE_ANYTHING:
+        return [(EVERYTHING, True)]
+    if name in READ_WORKSPACE:
+        return [(WORKSPACE_ROOT, False)]
+    found = []
+    for table, is_write in ((READ_ARGS, False), (WRITE_ARGS, True)):
+        for arg in table.get(name, ()):
+            value = args.get(arg)
+            values = value if isinstance(value, list) else [value]
+            found += [(_normalize(v), is_write) for v in values if isinstance(v, str)]
+    return found
+
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(path.strip() or WORKSPACE_ROOT)
+
+
+def _overlaps(a: str, b: str) -> bool:
+    if EVERYTHING in (a, b) or a == b or WORKSPACE_ROOT in (a, b):
+        return True
+    return a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def conflicts(a: list[tuple[str, bool]], b: list[tuple[str, bool]]) -> bool:
+    return any((wa or wb) and _overlaps(pa, pb) for pa, wa in a for pb, wb in b)
+
+
+class _Step:
+    """Tool calls emitted by one model message, and which of them have finished."""
+
+    def __init__(self, key: str, calls: list[dict]):
+        self.key = key
+        self.ids = [call.get("id") for call in calls]
+        self.accesses = [accesses(call) for call in calls]
+        self.done: set[int] = set()
+
+    def blockers(self, index: int) -> list[int]:
+        """Earlier calls in this step that touch the same paths, with at least one writing."""
+        mine = self.accesses[index]
+        if not mine:
+            return []
+        return [j for j in range(index) if conflicts(self.accesses[j], mine)]
+
+
+class PathLocks:
+    """One lock per written path, shared by every agent thread in the process."""
+
+    def __init__(self):
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def hold(self, paths) -> contextlib.ExitStack:
+        stack = contextlib.ExitStack()
+        # Always acquire in sorted order so two writers can never deadlock
+        for path in sorted(set(paths)):
+            with self._guard:
+                lock = self._locks.setdefault(path, threading.Lock())
+            stack.enter_context(lock)
+        return stack
+
+
+class ToolConcurrencyMiddleware(AgentMiddleware):
+    """
+    Bound and order the tool calls of one model step.
+
+    LangGraph already runs the calls of a step concurrently and appends
+    their results in call order. This adds what it lacks: at most
+    `max_workers` tool bodies run at once, and calls that touch the same path
+    (with at least one writing) run in the order the model emitted them.
+    Terminal commands are ordered against every file access. Across agent
+    threads (e.g. parallel plan workers), writes to one path never overlap.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        super().__init__()
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._steps: dict[str, _Step] = {}
+        self._changed = threading.Condition()
+        self.path_locks = PathLocks()
+
+    def wrap_tool_call(self, request, handler):
+        step, index = self._locate(request)
+        if step is not None:
+            with self._changed:
+                self._changed.wait_for(lambda: all(j in step.done for j in step.blockers(index)))
+        writes = [path for path, is_write in accesses(request.tool_call) if is_write and path != EVERYTHING]
+        try:
+            with self._slots, self.path_locks.hold(writes):
+                return handler(request)
+        finally:
+            if step is not None:
+                self._finish(step, index)
+
+    def _locate(self, request) -> tuple[_Step | None, int]:
+        call_id = request.tool_call.get("id")
+        messages = (request.state or {}).get("messages", []) if isinstance(request.state, dict) else []
+        for message in reversed(messages):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                calls = message.tool_calls
+                if len(calls) < 2 or call_id not in [c.get("id") for c in calls]:
+                    return None, 0
+                key = message.id or ":".join(str(c.get("id")) for c in calls)
+                with self._changed:
+                    step = self._steps.get(key)
+                    if step is None:
+                        step = self._steps[key] = _Step(key, calls)
+                return step, step.ids.index(call_id)
+        return None, 0
+
+    def _finish(self, step: _Step, index: int) -> None:
+        with self._changed:
+            step.done.add(index)
+            if len(step.done) == len(step.ids):
+                self._steps.pop(step.key, None)
+            self._changed.notify_all()
@@ -0,0 +1,124 @@
+import os
+import re
+import tempfile
+from pathlib import Path
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+SR_BLOCK = re.compile(
+    r"<<<<<<< SEARCH\n(.*?)\n?=======\n(.*?)\n?>>>>>>> REPLACE",
+    re.DOTALL,
+)
+
+
+class PatchError(ValueError):
+    """Raised when a patch does not apply cleanly."""
+
+
+def is_search_replace(patch: str) -> bool:
+    return "<<<<<<< SEARCH" in patch
+
+
+def apply_search_replace(text: str, patch: str) -> tuple[str, int]:
+    """
+    Apply one or more SEARCH/REPLACE blocks. Each SEARCH text must occur
+    exactly once in the (progressively edited) file.
+    """
+    blocks = SR_BLOCK.findall(patch)
+    if not blocks:
+        raise PatchError("No SEARCH/REPLACE blocks found.")
+    for i, (search, replace) in enumerate(blocks, 1):
+        text = replace_once(text, search, replace, label=f"block {i}")
+    return text, len(blocks)
+
+
+def replace_once(text: str, search: str, replace: str, label: str = "search text") -> str:
+    if not search:
+        raise PatchError(f"{label}: search text is empty.")
+    count = text.count(search)
+    if count == 0:
+        raise PatchError(f"{label}: search text not found.")
+    if count > 1:
+        raise PatchError(f"{label}: search text matches {count} times; add more context.")
+    return text.replace(search, replace, 1)
+
+
+def _parse_hunks(diff: str) -> list[tuple[int, list[str], list[str]]]:
+    """Return (old_start, old_lines, new_lines) for each hunk of a unified diff."""
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None or line.startswith(("--- ", "+++ ")):
+            continue
+        if line.startswith("\\"):  # "\ No newline at end of file"
+            continue
+        tag, body = (line[:1], line[1:]) if line else (" ", "")
+        if tag == " ":
+            current[1].append(body)
+            current[2].append(body)
+        elif tag == "-":
+            current[1].append(body)
+        elif tag == "+":
+            current[2].append(body)
+        else:
+            raise PatchError(f"Malformed diff line: {line!r}")
+    if not hunks:
+        raise PatchError("No hunks found in unified diff.")
+    return hunks
+
+
+def _find_hunk(lines: list[str], old: list[str], expected: int) -> int:
+    """Locate the hunk's context, trying the expected line first, then nearest offsets."""
+    if not old:
+        return min(max(expected, 0), len(lines))
+    span = len(old)
+    for delta in range(0, len(lines) + 1):
+        for pos in (expected - delta, expected + delta):
+            if 0 <= pos <= len(lines) - span and lines[pos:pos + span] == old:
+                return pos
+    raise PatchError(f"Hunk at line {expected + 1}: context lines do not match the file.")
+
+
+def apply_unified_diff(text: str, diff: str) -> tuple[str, int]:
+    """Apply a unified diff, validating every context and removed line."""
+    trailing_newline = text.endswith("\n")
+    lines = text.splitlines()
+    offset = 0
+    hunks = _parse_hunks(diff)
+    for old_start, old, new in hunks:
+        # A hunk with no old lines (`git diff -U0` insertion, "@@ -10,0 +11 @@") inserts
+        # after line old_start, so its index is old_start rather than old_start - 1
+        anchor = old_start if not old else max(old_start - 1, 0)
+        pos = _find_hunk(lines, old, anchor + offset)
+        lines[pos:pos + len(old)] = new
+        offset = pos - anchor + len(new) - len(old)
+    result = "\n".join(lines)
+    if trailing_newline or (lines and not text):
+        result += "\n"
+    return result, len(hunks)
+
+
+def apply_patch_text(text: str, patch: str) -> tuple[str, int]:
+    """Apply either SEARCH/REPLACE blocks or a unified diff, detected from the patch."""
+    if is_search_replace(patch):
+        return apply_search_replace(text, patch)
+    return apply_unified_diff(text, patch)
+
+
+def atomic_write(path: Path, content: str) -> None:
+    """Write via a temp file in the same directory and rename over the target."""
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+
+from .patching import atomic_write
+
+STATUSES = ("pending", "in_progress", "done", "skipped")
+CHECKBOX = {"pending": " ", "in_progress": "~", "done": "x", "skipped": "-"}
+LEGACY_STEP = re.compile(r"^\s*- \[([ xX~-])\]\s*(?:#(\d+)\s+)?(.*)$")
+# Dependencies are written at the end of a step: "Write the API (after #1, #3)"
+STEP_DEPS = re.compile(r"\s*\(after\s+(#?\d+(?:\s*,\s*#?\d+)*)\)\s*$", re.IGNORECASE)
+# Steps with these statuses no longer hold up the steps that depend on them
+SETTLED = ("done", "skipped")
+
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def plan_lock(path: Path) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(str(path), threading.Lock())
+
+
+class PlanError(ValueError):
+    """Raised for unknown steps or invalid statuses."""
+
+
+class Plan:
+    """
+    A plan backed by a JSON sidecar (`plan.md` -> `plan.md.json`).
+
+    The sidecar is the source of truth; the markdown file is rendered from
+    it after every change. If the markdown was edited by hand since (its
+    hash no longer matches the one recorded at save time), it is re-parsed
+    instead, so the edit is not overwritten. Step ids are assigned from a
+    counter and never reused, so they stay stable when steps are inserted
+    or reordered.
+    """
+
+    def __init__(self, path: Path, data: dict):
+        self.path = path
+        self.data = data
+
+    # --- Loading and saving ---
+    @staticmethod
+    def sidecar(path: Path) -> Path:
+        return path.with_name(path.name + ".json")
+
+    @classmethod
+    def create(cls, path: Path, steps: list[str]) -> "Plan":
+        plan = cls(path, {"name": path.name, "next_id": 1, "steps": []})
+        plan.add_steps(steps)
+        return plan
+
+    @classmethod
+    def load(cls, path: Path) -> "Plan":
+        sidecar = cls.sidecar(path)
+        if sidecar.exists():
+            data = json.loads(sidecar.read_text())
+            if not path.exists():
+                return cls(path, data)
+            markdown = path.read_text()
+            if data.get("markdown_sha") in (None, _digest(markdown)):
+                return cls(path, data)
+            # plan.md was edited directly since the last save: it wins
+            return cls._from_markdown(path, markdown, previous=data)
+        if path.exists():
+            return cls._from_markdown(path, path.read_text())
+        raise PlanError(f"Plan {path} does not exist.")
+
+    @classmethod
+    def _from_markdown(cls, path: Path, markdown: str, previous: dict | None = None) -> "Plan":
+        """Parse a plan written (or edited) by hand; results and the id counter carry over from `previous`."""
+        previous = previous or {}
+        plan = cls(path, {"name": previous.get("name", path.name), "next_id": previous.get("next_id", 1), "steps": []})
+        marks = {v: k for k, v in CHECKBOX.items()}
+        results = {s["id"]: s["result"] for s in previous.get("steps", []) if s.get("result")}
+        for line in markdown.splitlines():
+            match = LEGACY_STEP.match(line)
+            if match:
+                mark, step_id, text = match.groups()
+                step = plan._new_step(text.strip())
+                if step_id and not any(s["id"] == step_id for s in plan.steps):
+                    step["id"] = step_id
+                    # Hand back the counter id _new_step took, since this step keeps its own
+                    plan.data["next_id"] = max(plan.data["next_id"] - 1, int(step_id) + 1)
+                step["status"] = marks.get(mark.lower(), "pending")
+                if step["id"] in results:
+                    step["result"] = results[step["id"]]
+                plan.data["steps"].append(step)
+        _check_acyclic(plan.steps)
+        return plan
+
+    def save(self) -> None:
+        markdown = self.render()
+        self.data["markdown_sha"] = _digest(markdown)
+        atomic_write(self.sidecar(self.path), json.dumps(self.data, indent=2))
+        atomic_write(self.path, markdown)
+
+    def render(self) -> str:
+        lines = [f"# Plan: {self.data['name']}", ""]
+        for step in self.data["steps"]:
+            lines.append(f"- [{CHECKBOX[step['status']]}] #{step['id']} {step['text']}{_deps_suffix(step)}")
+            if step.get("result"):
+                lines.append(f"    > {step['result'].splitlines()[0]}")
+        return "\n".join(lines) + "\n"
+
+    # --- Steps ---
+    @property
+    def steps(self) -> list[dict]:
+        return self.data["steps"]
+
+    def _new_step(self, text: str) -> dict:
+        step = {"id": str(self.data["next_id"]), "text": text, "status": "pending"}
+        match = STEP_DEPS.search(text)
+        if match:
+            step["text"] = text[:match.start()].strip()
+            step["deps"] = [d.strip().lstrip("#") for d in match.group(1).split(",")]
+        self.data["next_id"] += 1
+        return step
+
+    def add_steps(self, texts: list[str], after_id: str | None = None) -> list[dict]:
+        new = [self._new_step(t.strip()) for t in texts if t.strip()]
+        known = {s["id"] for s in self.steps} | {s["id"] for s in new}
+        for step in new:
+            missing = [d for d in step.get("deps", []) if d not in known or d == step["id"]]
+            if missing:
+                raise PlanError(f"Step #{step['id']} depends on unknown step(s) {', '.join('#' + d for d in missing)}.")
+        _check_acyclic(self.steps + new)
+        if after_id is None:
+            self.steps.extend(new)
+        else:
+            index = self._index_of(after_id) + 1
+            self.steps[index:index] = new
+        return new
+
+    def _index_of(self, step_id: str) -> int:
+        for i, step in enumerate(self.steps):
+            if step["id"] == str(step_id):
+                return i
+        raise PlanError(f"Step #{step_id} not found.")
+
+    def step_by_index(self, index: int) -> dict:
+        if not 0 <= index < len(self.steps):
+            raise PlanError(f"Step index {index} not found or invalid.")
+        return self.steps[index]
+
+    def set_status(self, step_ids: list[str], status: str) -> list[dict]:
+        if status not in STATUSES:
+            raise PlanError(f"Invalid status {status!r}; use one of {', '.join(STATUSES)}.")
+        # Validate everything first so a bad id changes nothing
+        steps = [self.steps[self._index_of(step_id)] for step_id in step_ids]
+        for step in steps:
+            step["status"] = status
+        return steps
+
+    def filter(self, status: str | None = None) -> list[dict]:
+        return [s for s in self.steps if status is None or s["status"] == status]
+
+    def next_pending(self) -> dict | None:
+        return next((s for s in self.steps if s["status"] == "pending"), None)
+
+    def ready(self) -> list[dict]:
+        """Pending steps whose dependencies are all settled, in plan order."""
+        settled = {s["id"] for s in self.steps if s["status"] in SETTLED}
+        return [s for s in self.steps if s["status"] == "pending" and set(s.get("deps", [])) <= settled]
+
+    def set_result(self, step_id: str, status: str, result: str) -> dict:
+        step = self.set_status([step_id], status)[0]
+        step["result"] = result
+        return step
+
+
+def edit_plan(path: Path, change) -> tuple[Plan, object]:
+    """Load, apply `change(plan)`, save. Serialized per plan file."""
+    with plan_lock(path):
+        plan = Plan.load(path)
+        result = change(plan)
+        plan.save()
+        return plan, result
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _check_acyclic(steps: list[dict]) -> None:
+    """Raise PlanError if step dependencies form a cycle, which would block those steps forever."""
+    deps = {s["id"]: s.get("deps", []) for s in steps}
+    state: dict[str, int] = {}  # 1 while visiting, 2 once finished
+
+    def visit(step_id: str, path: list[str]) -> None:
+        if state.get(step_id) == 2 or step_id not in deps:
+            return
+        if state.get(step_id) == 1:
+            cycle = path[path.index(step_id):] + [step_id]
+            raise PlanError(f"Dependency cycle: {' -> '.join('#' + s for s in cycle)}.")
+        state[step_id] = 1
+        for dep in deps[step_id]:
+            visit(dep, path + [step_id])
+        state[step_id] = 2
+
+    for step_id in deps:
+        visit(step_id, [])
+
+
+def _deps_suffix(step: dict) -> str:
+    deps = step.get("deps")
+    return f" (after {', '.join('#' + d for d in deps)})" if deps else ""
+
+
+def format_steps(steps: list[dict]) -> str:
+    return "\n".join(f"#{s['id']} [{s['status']}] {s['text']}{_deps_suffix(s)}" for s in steps)
@@ -0,0 +1,208 @@
+import contextvars
+import random
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_TEXT = re.compile(r"\b429\b|RESOURCE_EXHAUSTED|rate.?limit|UNAVAILABLE|overloaded|timed? ?out", re.IGNORECASE)
+RETRY_AFTER_TEXT = re.compile(
+    r"retry(?:[_ -]?after|[_ ]delay|ing)?\D{0,20}?(\d+(?:\.\d+)?)\s*(ms|s\b|seconds?)?", re.IGNORECASE
+)
+
+
+def _status_of(error: BaseException) -> int | None:
+    for candidate in (
+        getattr(error, "status_code", None),
+        getattr(error, "code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def _retry_after_of(error: BaseException) -> float | None:
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+    match = RETRY_AFTER_TEXT.search(str(error))
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if (match.group(2) or "").lower() == "ms" else seconds
+    return None
+
+
+def classify_error(error: BaseException) -> tuple[bool, float | None]:
+    """Return (retryable, retry_after_seconds) for an exception from a model call."""
+    status = _status_of(error)
+    if status is not None:
+        retryable = status in RETRYABLE_STATUS
+    else:
+        retryable = isinstance(error, (TimeoutError, ConnectionError)) or bool(RETRYABLE_TEXT.search(str(error)))
+    return retryable, (_retry_after_of(error) if retryable else None)
+
+
+class CallTimeout(TimeoutError):
+    """An attempt ran past ResilientCaller.timeout; retryable like any other timeout."""
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_retry_after: float = 60.0
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class ResilientCaller:
+    """
+    Wraps a blocking call with retries, a concurrency cap and optional hedging.
+
+    - Retryable failures (429/5xx/timeouts) are retried with exponential
+      backoff and full jitter, honouring Retry-After when the error has one.
+    - At most `max_concurrency` calls run at once across every session
+      sharing this caller; the rest wait for a slot.
+    - With `hedge=True`, once enough latencies are known, a call still
+      running after the `hedge_quantile` latency gets a duplicate request
+      (`hedge_fn`, when the caller passes one); whichever finishes first
+      wins. A hedge needs a free concurrency slot of its own and is skipped
+      when none is available, so hedging never exceeds the cap. A slot is
+      held until its request really finishes, even after the other one won.
+    - With `timeout`, an attempt that has not finished after that many
+      seconds raises CallTimeout, which is retried like any other timeout.
+      The abandoned request keeps its slot until it returns.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        max_concurrency: int = 4,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        min_samples: int = 20,
+        timeout: float | None = None,
+        sleep=time.sleep,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.timeout = timeout or None
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.sleep = sleep
+        self.latencies: deque[float] = deque(maxlen=200)
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.timeouts = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(2, max_concurrency * 2), thread_name_prefix="hedge")
+
+    def hedge_after(self) -> float | None:
+        """Latency threshold after which a hedge is sent, or None when not enough data."""
+        with self._lock:
+            if not self.hedge or len(self.latencies) < self.min_samples:
+                return None
+            cuts = statistics.quantiles(self.latencies, n=100)
+        return cuts[min(int(self.hedge_quantile * 100) - 1, 98)]
+
+    def call(self, fn, hedge_fn=None):
+        """Run `fn` with retries; `hedge_fn` is the duplicate to race against a slow `fn` (no hedging if None)."""
+        self.calls += 1
+        for attempt in range(self.policy.max_attempts):
+            try:
+                self._slots.acquire()
+                started = time.perf_counter()
+                result = self._call_once(fn, hedge_fn)
+                with self._lock:
+                    self.latencies.append(time.perf_counter() - started)
+                return result
+            except Exception as e:
+                retryable, retry_after = classify_error(e)
+                if not retryable or attempt == self.policy.max_attempts - 1:
+                    self.failures += 1
+                    raise
+                if retry_after is not None:
+                    delay = min(retry_after, self.policy.max_retry_after)
+                else:
+                    delay = self.policy.backoff(attempt)
+                self.retries += 1
+                self.sleep(delay)
+
+    def _call_once(self, fn, hedge_fn=None):
+        """One attempt; takes over the slot `call` acquired and releases it when `fn` finishes."""
+        threshold = self.hedge_after() if hedge_fn is not None else None
+        if threshold is None and self.timeout is None:
+            try:
+                return fn()
+            finally:
+                self._slots.release()
+
+        # Run in worker threads with the caller's context (LangGraph config lives in contextvars)
+        release = lambda _: self._slots.release()
+        try:
+            primary = self._pool.submit(contextvars.copy_context().run, fn)
+        except BaseException:
+            self._slots.release()
+            raise
+        primary.add_done_callback(release)
+
+        started = time.monotonic()
+        deadline = started + self.timeout if self.timeout else None
+        pending = {primary}
+        hedge = None
+        first_error = None
+        while pending:
+            now = time.monotonic()
+            waits = [deadline - now] if deadline is not None else []
+            if threshold is not None:
+                waits.append(started + threshold - now)
+            done, pending = wait(pending, timeout=max(min(waits), 0) if waits else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result()
+                first_error = first_error or future.exception()
+            if done:
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                self.timeouts += 1
+                raise CallTimeout(f"Model call did not finish within {self.timeout:g}s.")
+            if threshold is not None:
+                threshold = None  # One hedge at most, and only if a slot is free right now
+                if self._slots.acquire(blocking=False):
+                    self.hedges += 1
+                    hedge = self._pool.submit(contextvars.copy_context().run, hedge_fn)
+                    hedge.add_done_callback(release)
+                    pending.add(hedge)
+        raise first_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "p50_s": statistics.median(latencies) if latencies else None,
+        }
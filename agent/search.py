@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DuckDuckGoBackend:
+    """Default search backend; reuses one DDGS client across calls."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from duckduckgo_search import DDGS
+                self._client = DDGS()
+            return self._client
+
+    def search(self, query: str, max_results: int = 5) -> list[dict]:
+        return list(self._get_client().text(query, max_results=max_results) or [])
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float = 600, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace/punctuation so near-identical queries share a key."""
+    words = re.findall(r"[\w.+#-]+", query.lower())
+    return " ".join(words)
+
+
+_backend = DuckDuckGoBackend()
+_cache = TTLCache()
+
+
+def set_search_backend(backend) -> None:
+    """Replace the search backend (any object with `search(query, max_results)`), e.g. a local fake."""
+    global _backend
+    _backend = backend
+    _cache.clear()
+
+
+def cached_search(query: str, max_results: int = 5) -> list[dict]:
+    """Search with the current backend, serving repeated normalized queries from the TTL cache."""
+    key = f"{max_results}:{normalize_query(query)}"
+    results = _cache.get(key)
+    if results is None:
+        results = _backend.search(query, max_results=max_results)
+        _cache.set(key, results)
+    return results
+
+
+def batch_search(queries: list[str], max_results: int = 5, max_workers: int = 4) -> list[dict]:
+    """
+    Run several queries concurrently and merge their results.
+    Queries that normalize to the same key are issued once (labelled with
+    their first spelling) and duplicate URLs are dropped.
+    """
+    by_key: dict[str, str] = {}
+    for q in queries:
+        key = normalize_query(q)
+        if key:
+            by_key.setdefault(key, q)
+    unique = list(by_key.values())
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique) or 1))) as pool:
+        batches = list(pool.map(lambda q: _safe_search(q, max_results), unique))
+
+    seen = set()
+    merged = []
+    for query, results in zip(unique, batches):
+        if isinstance(results, Exception):
+            merged.append({"query": query, "error": str(results)})
+            continue
+        for r in results:
+            url = r.get("href")
+            if url in seen:
+                continue
+            seen.add(url)
+            merged.append({"query": query, **r})
+    return merged
+
+
+def _safe_search(query: str, max_results: int):
+    try:
+        return cached_search(query, max_results)
+    except Exception as e:
+        return e
+
+
+def format_results(results: list[dict]) -> str:
+    return "\n\n".join(
+        f"Title: {r['title']}\nURL: {r['href']}\nSnippet: {r['body']}" for r in results
+    )
@@ -0,0 +1,319 @@
+import base64
+import contextlib
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+
+# Output kept per stream per command; anything beyond is counted but not stored
+MAX_CAPTURE = 1_000_000
+
+# Each command runs in a subshell (its own process group under job control), so a
+# timeout stops the whole command list at once. On a normal finish the subshell
+# writes its cwd, variables, functions and aliases to a state file that the parent
+# shell sources, so `cd`, `export` and `source venv/bin/activate` still carry over.
+_BASH_PRELUDE = r"""
+__agentic_save() {
+  {
+    for __agentic_v in $(compgen -v); do
+      case $__agentic_v in
+        BASH*|EUID|PPID|UID|SHELLOPTS|SHLVL|RANDOM|SRANDOM|SECONDS|LINENO|FUNCNAME|PIPESTATUS|GROUPS|EPOCH*|HISTCMD|_|__agentic_*|PS1|PS2|PS4|DIRSTACK|COMP_*|OPTIND|OPTARG|PWD|OLDPWD) continue;;
+      esac
+      declare -p "$__agentic_v"
+    done
+    for __agentic_v in $__agentic_vars; do
+      declare -p "$__agentic_v" >/dev/null 2>&1 || builtin printf 'unset -v %q\n' "$__agentic_v"
+    done
+    for __agentic_v in $__agentic_funcs; do
+      declare -F "$__agentic_v" >/dev/null || builtin printf 'unset -f %q\n' "$__agentic_v"
+    done
+    for __agentic_v in $(compgen -A function); do
+      case $__agentic_v in __agentic_*) continue;; esac
+      declare -f "$__agentic_v"
+    done
+    builtin printf 'builtin unalias -a\n'
+    alias -p
+    builtin printf 'OLDPWD=%q\nbuiltin cd -- %q\n' "$OLDPWD" "$PWD"
+  } > "$1" 2>/dev/null
+}
+__agentic_run() {
+  (
+    __agentic_vars=$(compgen -v); __agentic_funcs=$(compgen -A function)
+    eval "$2" < /dev/null
+    __agentic_status=$?
+    __agentic_save "$1.tmp" && builtin command mv -f "$1.tmp" "$1"
+    exit $__agentic_status
+  )
+}
+"""
+
+
+class _Stream:
+    """Drains one pipe on a background thread so the shell never blocks on a full pipe."""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.buffer = bytearray()
+        self.dropped = 0
+        self.rescan_from = None
+        self.closed = False
+        self.cond = threading.Condition()
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self):
+        fd = self.pipe.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b""
+            with self.cond:
+                if not chunk:
+                    self.closed = True
+                    self.cond.notify_all()
+                    return
+                self.buffer += chunk
+                # Keep memory bounded for chatty commands: keep the head and the latest tail
+                if len(self.buffer) > MAX_CAPTURE * 2:
+                    tail = self.buffer[-65536:]
+                    self.dropped += len(self.buffer) - MAX_CAPTURE - len(tail)
+                    del self.buffer[MAX_CAPTURE:]
+                    self.buffer += tail
+                    self.rescan_from = MAX_CAPTURE
+                self.cond.notify_all()
+
+    def wait_for(self, marker: bytes, deadline: float) -> int:
+        """Index of `marker` in the buffer, -1 on timeout, -2 if the pipe closed."""
+        with self.cond:
+            start = 0
+            while True:
+                index = self.buffer.find(marker, start)
+                if index >= 0:
+                    return index
+                if self.closed:
+                    return -2
+                start = max(len(self.buffer) - len(marker), 0)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return -1
+                self.cond.wait(remaining)
+                if self.rescan_from is not None:
+                    start, self.rescan_from = min(start, self.rescan_from), None
+
+    def take(self, end: int, skip: int) -> tuple[bytes, int]:
+        with self.cond:
+            data = bytes(self.buffer[:end])
+            del self.buffer[:end + skip]
+            dropped, self.dropped = self.dropped, 0
+        return data, dropped
+
+
+class ShellSession:
+    """
+    A long-lived bash process whose cwd, environment and activated
+    virtualenvs carry over from one command to the next.
+
+    Each command is sent base64-encoded through `eval`, so quoting or syntax
+    errors cannot desynchronise the session, followed by a unique sentinel
+    on stdout (with the exit code) and on stderr. Job control is on and the
+    command runs in a subshell, so one that outlives its timeout is killed
+    as a unit (its whole process group) without taking the shell down with
+    it; the state changes of a killed command are discarded.
+    """
+
+    def __init__(self, cwd: str, env: dict | None = None, shell: str | None = None):
+        self.cwd = str(cwd)
+        self.shell = shell or shutil.which("bash") or "/bin/sh"
+        self.env = env
+        self.commands = 0
+        self.last_used = time.monotonic()
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self) -> None:
+        self.state_dir = tempfile.mkdtemp(prefix="agentic-shell-")
+        self.proc = subprocess.Popen(
+            [self.shell, "--noprofile", "--norc"] if self.shell.endswith("bash") else [self.shell],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            start_new_session=True,
+        )
+        self.stdout = _Stream(self.proc.stdout)
+        self.stderr = _Stream(self.proc.stderr)
+        self._send("set -m 2>/dev/null; PS1=''; PS2=''\n")
+        if self.is_bash:
+            self._send(_BASH_PRELUDE)
+
+    @property
+    def is_bash(self) -> bool:
+        return os.path.basename(self.shell) == "bash"
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _send(self, text: str) -> None:
+        self.proc.stdin.write(text.encode())
+        self.proc.stdin.flush()
+
+    def run(self, command: str, timeout: float = 60.0) -> tuple[int | None, str, str, bool]:
+        """Run one command; returns (exit_code, stdout, stderr, timed_out)."""
+        with self._lock:
+            if not self.alive:
+                self._start()
+            self.commands += 1
+            self.last_used = time.monotonic()
+            token = uuid.uuid4().hex
+            out_marker = f"__AGENTIC_DONE_{token}__".encode()
+            err_marker = f"__AGENTIC_ERR_{token}__".encode()
+            encoded = base64.b64encode(command.encode()).decode()
+            decoded = f"\"$(printf '%s' '{encoded}' | base64 -d)\""
+            state = os.path.join(self.state_dir, token)
+            if self.is_bash:
+                self._send(
+                    f"__agentic_run '{state}' {decoded}\n"
+                    f"__agentic_status=$?; [ -f '{state}' ] && . '{state}' 2>/dev/null\n"
+                )
+            else:
+                self._send(f"( eval {decoded} < /dev/null )\n__agentic_status=$?\n")
+            self._send(
+                f"printf '\\n{out_marker.decode()} %d\\n' \"$__agentic_status\"\n"
+                f"printf '\\n{err_marker.decode()}\\n' >&2\n"
+            )
+
+            deadline = time.monotonic() + timeout
+            timed_out = False
+            index = self.stdout.wait_for(out_marker, deadline)
+            if index == -1:
+                timed_out = True
+                self._interrupt()
+                index = self.stdout.wait_for(out_marker, time.monotonic() + 3)
+            for leftover in (state, state + ".tmp"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(leftover)
+            if index < 0:
+                # The command killed the shell (e.g. `kill $$`) or ignored the interrupt
+                output = bytes(self.stdout.buffer).decode(errors="replace")
+                errors = bytes(self.stderr.buffer).decode(errors="replace")
+                self.restart()
+                note = "\n[shell session restarted; cwd and environment were reset]"
+                return None, output, errors + note, timed_out
+
+            code_end = self.stdout.buffer.find(b"\n", index)
+            code_text = bytes(self.stdout.buffer[index + len(out_marker):code_end]).strip()
+            out, out_dropped = self.stdout.take(max(index - 1, 0), code_end - max(index - 1, 0) + 1)
+            err_index = self.stderr.wait_for(err_marker, time.monotonic() + 2)
+            if err_index >= 0:
+                err, err_dropped = self.stderr.take(max(err_index - 1, 0), len(err_marker) + 2)
+            else:
+                err, err_dropped = b"", 0
+            return (
+                # A killed command has no meaningful exit code
+                None if timed_out else int(code_text) if code_text.lstrip(b"-").isdigit() else None,
+                _decode(out, out_dropped),
+                _decode(err, err_dropped),
+                timed_out,
+            )
+
+    def _interrupt(self) -> None:
+        """Stop whatever the shell is running. SIGINT would make bash exit too, so start at SIGTERM."""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            if not self._signal_children(sig):
+                return
+            time.sleep(0.5)
+
+    def _signal_children(self, sig) -> bool:
+        children = _children(self.proc.pid)
+        for pid in children:
+            try:
+                pgid = os.getpgid(pid)
+                # Never signal the shell's own group from here
+                if pgid == self.proc.pid:
+                    os.kill(pid, sig)
+                else:
+                    os.killpg(pgid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+        return bool(children)
+
+    def restart(self) -> None:
+        self.close()
+        self._start()
+
+    def close(self) -> None:
+        if self.alive:
+            self._signal_children(signal.SIGKILL)
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            pipe.close()
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+
+def _children(pid: int) -> list[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        result = subprocess.run(["pgrep", "-P", str(pid)], capture_output=True, text=True)
+        return [int(p) for p in result.stdout.split()]
+
+
+def _decode(data: bytes, dropped: int) -> str:
+    text = data.decode(errors="replace")
+    if dropped:
+        text = text[:MAX_CAPTURE] + f"\n[... {dropped} bytes of output not captured ...]\n" + text[MAX_CAPTURE:]
+    return text
+
+
+class ShellManager:
+    """One ShellSession per agent thread, created on first use and closed when idle."""
+
+    def __init__(self, cwd: str, max_sessions: int = 16, idle_timeout: float = 1800.0):
+        self.cwd = str(cwd)
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: dict[str, ShellSession] = {}
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str, cwd: str | None = None) -> ShellSession:
+        """The thread's session; a new one starts in `cwd` (default: the manager's)."""
+        with self._lock:
+            self._reap()
+            session = self.sessions.get(thread_id)
+            if session is None:
+                # Sessions running a command are never evicted; with all of them busy the cap is exceeded
+                idle = [k for k, s in self.sessions.items() if not s._lock.locked()]
+                if len(self.sessions) >= self.max_sessions and idle:
+                    oldest = min(idle, key=lambda k: self.sessions[k].last_used)
+                    self.sessions.pop(oldest).close()
+                session = self.sessions[thread_id] = ShellSession(str(cwd or self.cwd))
+            return session
+
+    def _reap(self) -> None:
+        now = time.monotonic()
+        for thread_id, session in list(self.sessions.items()):
+            if now - session.last_used > self.idle_timeout and not session._lock.locked():
+                self.sessions.pop(thread_id).close()
+
+    def reset(self, thread_id: str) -> None:
+        with self._lock:
+            session = self.sessions.pop(thread_id, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+        for session in sessions:
+            session.close()
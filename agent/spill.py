@@ -0,0 +1,162 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+
+from .context import current_thread_id
+
+HANDLE_PREFIX = "spill:"
+
+
+class SpillStore:
+    """
+    Content-addressed store for tool outputs that were too large for the prompt.
+
+    Each output is saved once under the SHA-256 of its bytes, so repeated
+    identical outputs (the same failing build log, say) cost no extra disk.
+    Oldest files are evicted once the store grows past `max_bytes`.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 256 << 20):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        path = self._path(digest)
+        with self._lock:
+            if path.exists():
+                os.utime(path)  # Recently used: keep it through eviction
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+                self._evict(keep=path)
+        return HANDLE_PREFIX + digest
+
+    def read(self, handle: str, offset: int = 0, length: int = 8000) -> tuple[str, int, int]:
+        """Text from byte `offset`; returns (text, next_offset, total_bytes). Never splits a character."""
+        path = self._resolve(handle)
+        total = path.stat().st_size
+        offset = min(max(offset, 0), total)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            # Skip continuation bytes so a page never starts mid-character
+            data = f.read(length + 3)
+        start = 0
+        while start < len(data) and start < 3 and data[start] & 0xC0 == 0x80:
+            start += 1
+        data = data[start:start + length]
+        end = _complete_utf8(data, at_eof=offset + start + len(data) >= total)
+        return data[:end].decode("utf-8", errors="replace"), offset + start + end, total
+
+    def _resolve(self, handle: str) -> Path:
+        digest = handle.strip().removeprefix(HANDLE_PREFIX)
+        if not digest or not all(c in "0123456789abcdef" for c in digest):
+            raise KeyError(f"Invalid handle {handle!r}.")
+        path = self._path(digest)
+        if not path.exists():
+            raise KeyError(f"Unknown or expired handle {handle!r}.")
+        return path
+
+    def _evict(self, keep: Path) -> None:
+        files = [p for p in self.root.glob("*/*") if p.suffix != ".tmp" and p != keep]
+        stats = [(p, p.stat()) for p in files]
+        total = sum(s.st_size for _, s in stats) + keep.stat().st_size
+        for path, stat in sorted(stats, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+
+def _complete_utf8(data: bytes, at_eof: bool) -> int:
+    """Length of `data` without a trailing partial UTF-8 sequence."""
+    if at_eof:
+        return len(data)
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue  # Continuation byte; keep looking for the lead byte
+        need = 2 if byte >> 5 == 0b110 else 3 if byte >> 4 == 0b1110 else 4 if byte >> 3 == 0b11110 else 1
+        return len(data) if need <= back else len(data) - back
+    return len(data)
+
+
+@dataclass
+class SpillStats:
+    """Per-thread count of tool output kept out of the prompt."""
+    results: int = 0
+    spilled: int = 0
+    bytes_total: int = 0
+    bytes_kept_out: int = 0
+
+
+class ToolOutputBudgetMiddleware(AgentMiddleware):
+    """
+    Cap every tool result before it enters the message history.
+
+    Results over `max_bytes` are written to the SpillStore; the model gets a
+    head and tail preview plus a handle it can page through with
+    `read_spill`. The paging tool itself is exempt, since its pages are
+    already bounded. `store` may be a callable returning the store, so the
+    middleware always writes where `read_spill` reads, even if the store
+    is swapped later.
+    """
+
+    def __init__(self, store, max_bytes: int = 16000, exempt: set[str] | None = None):
+        super().__init__()
+        self._store = store
+        self.max_bytes = max_bytes
+        self.exempt = exempt or {"read_spill"}
+        self.stats: dict[str, SpillStats] = {}
+
+    @property
+    def store(self) -> SpillStore:
+        return self._store() if callable(self._store) else self._store
+
+    def thread_stats(self, thread_id: str) -> SpillStats:
+        return self.stats.setdefault(thread_id, SpillStats())
+
+    def forget(self, thread_id: str) -> None:
+        self.stats.pop(thread_id, None)
+
+    def wrap_tool_call(self, request, handler):
+        result = handler(request)
+        if not isinstance(result, ToolMessage) or result.name in self.exempt:
+            return result
+        content = result.content if isinstance(result.content, str) else str(result.content)
+        size = len(content.encode("utf-8"))
+        stats = self.thread_stats(current_thread_id())
+        stats.results += 1
+        stats.bytes_total += size
+        if size <= self.max_bytes:
+            return result
+
+        handle = self.store.put(content)
+        preview = self.preview(content, handle, size)
+        stats.spilled += 1
+        stats.bytes_kept_out += size - len(preview.encode("utf-8"))
+        return result.model_copy(update={"content": preview})
+
+    def preview(self, content: str, handle: str, size: int) -> str:
+        # Half the budget for the preview, 3/4 head and 1/4 tail; errors and summaries tend to sit at the end
+        head_chars = self.max_bytes * 3 // 8
+        tail_chars = self.max_bytes // 8
+        head, tail = content[:head_chars], content[-tail_chars:]
+        return (
+            f"{head}\n"
+            f"[... output truncated: {size} bytes in total. Full output saved as {handle}; "
+            f"page through it with read_spill(handle=\"{handle}\", offset=...) ...]\n"
+            f"{tail}"
+        )
@@ -0,0 +1,136 @@
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class StreamEvent:
+    """A single event emitted while an agent turn is streaming."""
+    kind: str  # "token", "tool_start", "tool_end", "step", "final"
+    text: str = ""
+    tool_name: str | None = None
+    tool_call_id: str | None = None
+    elapsed: float = 0.0
+    data: object = None
+
+
+@dataclass
+class TurnMetrics:
+    """Perceived-latency numbers for one streamed turn."""
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: float | None = None
+    step_latencies: list[tuple[str, float]] = field(default_factory=list)
+    finished_at: float | None = None
+    _last_step_at: float | None = None
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total(self) -> float | None:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def mark_step(self, node: str) -> float:
+        now = time.perf_counter()
+        latency = now - (self._last_step_at or self.started_at)
+        self._last_step_at = now
+        self.step_latencies.append((node, latency))
+        return latency
+
+    def summary(self) -> str:
+        ttft = self.time_to_first_token
+        parts = [f"TTFT: {ttft:.2f}s" if ttft is not None else "TTFT: n/a"]
+        if self.total is not None:
+            parts.append(f"total: {self.total:.2f}s")
+        parts.append(f"steps: {len(self.step_latencies)}")
+        per_node = self.node_latencies()
+        if per_node:
+            parts.append(", ".join(
+                f"{node} {seconds:.2f}s" + (f" ×{count}" if count > 1 else "")
+                for node, (count, seconds) in per_node.items()
+            ))
+        return " | ".join(parts)
+
+    def node_latencies(self) -> dict[str, tuple[int, float]]:
+        """(step count, total seconds) per graph node, in order of first appearance."""
+        totals: dict[str, tuple[int, float]] = {}
+        for node, latency in self.step_latencies:
+            count, seconds = totals.get(node, (0, 0.0))
+            totals[node] = (count + 1, seconds + latency)
+        return totals
+
+
+def _chunk_text(chunk) -> str:
+    """Extract plain text from a streamed message chunk."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    # Gemini may return a list of content blocks
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def stream_turn(agent, user_input: str, config: dict, context, metrics: TurnMetrics | None = None):
+    """
+    Run one agent turn via the LangGraph stream API.
+    Yields StreamEvent objects for partial text, tool starts/ends and steps,
+    ending with a single "final" event carrying the structured response.
+    """
+    metrics = metrics or TurnMetrics()
+    final_state = None
+
+    for mode, chunk in agent.stream(
+        {"messages": [{"role": "user", "content": user_input}]},
+        config=config,
+        context=context,
+        stream_mode=["messages", "updates", "values"],
+    ):
+        now = time.perf_counter()
+        if mode == "messages":
+            message, _meta = chunk
+            if getattr(message, "type", "") not in ("AIMessageChunk", "ai"):
+                continue
+            text = _chunk_text(message)
+            if text:
+                if metrics.first_token_at is None:
+                    metrics.first_token_at = now
+                yield StreamEvent("token", text=text, elapsed=now - metrics.started_at)
+
+        elif mode == "updates":
+            for node, update in (chunk or {}).items():
+                latency = metrics.mark_step(node)
+                yield StreamEvent("step", text=node, elapsed=latency)
+                for message in (update or {}).get("messages", []) or []:
+                    for call in getattr(message, "tool_calls", None) or []:
+                        yield StreamEvent(
+                            "tool_start",
+                            tool_name=call.get("name", "Unknown Tool"),
+                            tool_call_id=call.get("id"),
+                            elapsed=now - metrics.started_at,
+                            data=call.get("args"),
+                        )
+                    if getattr(message, "type", "") == "tool":
+                        yield StreamEvent(
+                            "tool_end",
+                            tool_name=getattr(message, "name", None) or "Unknown Tool",
+                            tool_call_id=getattr(message, "tool_call_id", None),
+                            elapsed=now - metrics.started_at,
+                            text=_chunk_text(message),
+                        )
+
+        elif mode == "values":
+            final_state = chunk
+
+    metrics.finished_at = time.perf_counter()
+    final_state = final_state or {}
+    yield StreamEvent(
+        "final",
+        elapsed=metrics.finished_at - metrics.started_at,
+        data=final_state.get("structured_response", final_state),
+    )
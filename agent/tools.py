@@ -1,38 +1,168 @@
 import os
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from langchain.tools import tool
 from .schema import Context
+from .patching import PatchError, apply_patch_text, atomic_write, replace_once
+from .workspace import WorkspaceIndex
+from .plans import Plan, PlanError, edit_plan, format_steps, plan_lock
+from .search import cached_search, batch_search, format_results
+from .context import current_thread_id
+from .shell import ShellManager
+from .jobs import JobError, JobManager
+from .spill import SpillStore
+from .fileio import (
+    MAX_FULL_READ,
+    SNIFF_SIZE,
+    decode,
+    detect_encoding,
+    read_bytes,
+    read_lines,
+    read_tail,
+    file_info as fileio_info,
+)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+# Agent threads with their own workspace (the batch runner gives each request one); others use BASE_DIR
+workspaces: dict[str, Path] = {}
+
+def workspace_dir() -> Path:
+    """Project directory for the current agent thread."""
+    return workspaces.get(current_thread_id(), BASE_DIR)
+
+def resolve_path(name: str) -> Path:
+    """Resolve a path relative to the workspace, refusing anything that escapes it."""
+    root = workspace_dir()
+    path = (root / name).resolve()
+    if path != root and root not in path.parents:
+        raise ValueError(f"Path {name} is outside the project directory.")
+    return path
 
 @tool
-def read_file(file_name: str, context: Context) -> str:
-    """Read the contents of a file."""
-    file_path = BASE_DIR / file_name
+def read_file(
+    file_name: str,
+    context: Context,
+    start_line: int | None = None,
+    end_line: int | None = None,
+    offset: int | None = None,
+    length: int | None = None,
+    head: int | None = None,
+    tail: int | None = None,
+) -> str:
+    """
+    Read the contents of a file, or only a slice of it.
+    start_line/end_line: 1-based inclusive line range.
+    offset/length: byte range.
+    head/tail: first or last N lines.
+    Large files are never returned whole; use file_info first and page through them.
+    """
+    try:
+        file_path = resolve_path(file_name)
+    except ValueError as e:
+        return f"Error: {e}"
     if not file_path.exists():
         return f"Error: The file {file_path} does not exist."
-    with open(file_path, 'r') as f:
-        return f.read()
+
+    encoding = detect_encoding(read_bytes(file_path, 0, SNIFF_SIZE))
+    if offset is not None or length is not None:
+        data = read_bytes(file_path, offset or 0, length if length is not None else MAX_FULL_READ)
+    elif start_line is not None or end_line is not None:
+        start = max((start_line or 1) - 1, 0)
+        data = read_lines(file_path, start, end_line)
+    elif head is not None:
+        data = read_lines(file_path, 0, head)
+    elif tail is not None:
+        data = read_tail(file_path, tail)
+    else:
+        size = file_path.stat().st_size
+        data = read_bytes(file_path, 0, MAX_FULL_READ)
+        if size > MAX_FULL_READ:
+            return (
+                decode(data, encoding)
+                + f"\n\n[Truncated: showing first {MAX_FULL_READ} of {size} bytes. "
+                "Use start_line/end_line, offset/length, head or tail to read more.]"
+            )
+
+    if len(data) > MAX_FULL_READ:
+        data = data[:MAX_FULL_READ]
+        return decode(data, encoding) + f"\n\n[Truncated at {MAX_FULL_READ} bytes; request a smaller range.]"
+    return decode(data, encoding)
+
+@tool
+def file_info(file_name: str) -> str:
+    """Get a file's size in bytes, line count and encoding without returning its contents."""
+    try:
+        file_path = resolve_path(file_name)
+    except ValueError as e:
+        return f"Error: {e}"
+    if not file_path.exists():
+        return f"Error: The file {file_path} does not exist."
+    info = fileio_info(file_path)
+    return f"Size: {info['size']} bytes\nLines: {info['lines']}\nEncoding: {info['encoding']}"
 
 @tool
 def write_file(file_name: str, content: str) -> str:
     """Write content to a file."""
-    file_path = BASE_DIR / file_name
+    try:
+        file_path = resolve_path(file_name)
+    except ValueError as e:
+        return f"Error: {e}"
     with open(file_path, 'w') as f:
         f.write(content)
     return f"Successfully wrote to {file_path}"
 
+@tool
+def edit_file(file_name: str, search: str, replace: str) -> str:
+    """
+    Replace one exact occurrence of `search` with `replace` in a file.
+    Much cheaper than write_file for small changes. `search` must match exactly once.
+    """
+    try:
+        file_path = resolve_path(file_name)
+        if not file_path.exists():
+            return f"Error: The file {file_path} does not exist."
+        text = file_path.read_text()
+        atomic_write(file_path, replace_once(text, search, replace))
+        return f"Successfully edited {file_path}"
+    except (PatchError, ValueError, OSError) as e:
+        return f"Error: {e}"
+
+@tool
+def apply_patch(file_name: str, patch: str) -> str:
+    """
+    Apply a patch to a file atomically. `patch` is either a unified diff
+    (with @@ hunks) or one or more blocks of the form:
+    <<<<<<< SEARCH
+    old text
+    =======
+    new text
+    >>>>>>> REPLACE
+    Context lines are validated; nothing is written if any part fails.
+    """
+    try:
+        file_path = resolve_path(file_name)
+        text = file_path.read_text() if file_path.exists() else ""
+        new_text, parts = apply_patch_text(text, patch)
+        atomic_write(file_path, new_text)
+        return f"Successfully applied {parts} change(s) to {file_path}"
+    except (PatchError, ValueError, OSError) as e:
+        return f"Error: Patch not applied to {file_name}: {e}"
+
 @tool
 def list_files(context: Context) -> str:
     """List all files in the project directory."""
-    files = [f.name for f in BASE_DIR.iterdir() if f.is_file()]
+    files = [f.name for f in workspace_dir().iterdir() if f.is_file()]
     return "\n".join(files)
 
 @tool
 def delete_file(file_name: str) -> str:
     """Delete a file."""
-    file_path = BASE_DIR / file_name
+    try:
+        file_path = resolve_path(file_name)
+    except ValueError as e:
+        return f"Error: {e}"
     if not file_path.exists():
         return f"Error: The file {file_path} does not exist."
     file_path.unlink()
@@ -41,7 +171,10 @@ def delete_file(file_name: str) -> str:
 @tool
 def append_to_file(file_name: str, content: str) -> str:
     """Append content to a file."""
-    file_path = BASE_DIR / file_name
+    try:
+        file_path = resolve_path(file_name)
+    except ValueError as e:
+        return f"Error: {e}"
     with open(file_path, 'a') as f:
         f.write(content)
     return f"Successfully appended to {file_path}"
@@ -49,7 +182,10 @@ def append_to_file(file_name: str, content: str) -> str:
 @tool
 def make_dir(dir_name: str) -> str:
     """Make a directory."""
-    dir_path = BASE_DIR / dir_name
+    try:
+        dir_path = resolve_path(dir_name)
+    except ValueError as e:
+        return f"Error: {e}"
     if dir_path.exists():
         return f"Error: The directory {dir_path} already exists."
     dir_path.mkdir(parents=True, exist_ok=True)
@@ -58,7 +194,12 @@ def make_dir(dir_name: str) -> str:
 @tool
 def delete_dir(dir_name: str) -> str:
     """Delete a directory."""
-    dir_path = BASE_DIR / dir_name
+    try:
+        dir_path = resolve_path(dir_name)
+    except ValueError as e:
+        return f"Error: {e}"
+    if dir_path == workspace_dir():
+        return "Error: Refusing to delete the project directory."
     if not dir_path.exists():
         return f"Error: The directory {dir_path} does not exist."
     try:
@@ -70,26 +211,163 @@ def delete_dir(dir_name: str) -> str:
 @tool
 def list_dir(dir_name: str) -> str:
     """List all files in a directory."""
-    dir_path = BASE_DIR / dir_name
+    try:
+        dir_path = resolve_path(dir_name)
+    except ValueError as e:
+        return f"Error: {e}"
     if not dir_path.exists():
         return f"Error: The directory {dir_path} does not exist."
     files = [f.name for f in dir_path.iterdir()]
     return "\n".join(files)
 
+# --- Workspace index: recursive listing, glob and content search ---
+workspace_index = WorkspaceIndex(BASE_DIR)
+_extra_indexes: dict[Path, WorkspaceIndex] = {}
+
+def current_index() -> WorkspaceIndex:
+    root = workspace_dir()
+    if root == workspace_index.root:
+        return workspace_index
+    index = _extra_indexes.get(root)
+    if index is None:
+        index = _extra_indexes[root] = WorkspaceIndex(root)
+    return index
+
+@tool
+def tree(dir_name: str = ".", max_depth: int = 4) -> str:
+    """
+    Recursively list a directory (default: project root) up to max_depth levels.
+    Skips .git, __pycache__, node_modules and virtualenvs.
+    """
+    entries = current_index().tree(dir_name, max_depth=max_depth)
+    return "\n".join(entries) if entries else f"No files found under {dir_name}."
+
+@tool
+def glob_files(pattern: str) -> str:
+    """Find project files whose relative path matches a glob pattern, e.g. 'src/**/*.py' or '*.md'."""
+    matches = current_index().glob(pattern)
+    return "\n".join(matches) if matches else f"No files match {pattern}."
+
+@tool
+def grep_files(query: str, regex: bool = False, file_pattern: str | None = None, max_results: int = 50) -> str:
+    """
+    Search file contents across the project.
+    query: text to find (case-insensitive) or a regular expression if regex=True.
+    file_pattern: optional glob to restrict which files are searched.
+    Returns 'path:line: text' for each match.
+    """
+    try:
+        matches = current_index().grep(query, regex=regex, pattern=file_pattern, max_results=max_results)
+    except Exception as e:
+        return f"Error searching files: {e}"
+    if not matches:
+        return f"No matches for {query}."
+    return "\n".join(f"{path}:{line}: {text}" for path, line, text in matches)
+
+# --- Batch tools: many items per tool call, I/O done concurrently ---
+BATCH_WORKERS = 8
+
+def _run_batch(fn, items: list) -> list[str]:
+    """Run `fn` over items on a thread pool, returning results in input order."""
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(items))) as pool:
+        return list(pool.map(_safe_call(fn), items))
+
+def _safe_call(fn):
+    def call(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return f"Error: {e}"
+    return call
+
+def _format_batch(labels: list[str], results: list[str]) -> str:
+    return "\n\n".join(f"=== {label} ===\n{result}" for label, result in zip(labels, results))
+
+@tool
+def read_files(file_names: list[str]) -> str:
+    """Read several files in one call. Each result is headed by its file name."""
+    results = _run_batch(lambda name: read_file.func(file_name=name, context=None), file_names)
+    return _format_batch(file_names, results)
+
+@tool
+def write_files(file_names: list[str], contents: list[str]) -> str:
+    """
+    Write several files in one call; contents[i] is written to file_names[i].
+    Missing parent directories are created. Use this to scaffold a project.
+    """
+    if len(file_names) != len(contents):
+        return f"Error: Got {len(file_names)} file names but {len(contents)} contents."
+
+    # Writes to the same path keep their order; different paths run concurrently
+    by_path: dict[str, list[str]] = {}
+    for name, content in zip(file_names, contents):
+        by_path.setdefault(name, []).append(content)
+
+    def write_all(name: str) -> str:
+        file_path = resolve_path(name)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        for content in by_path[name]:
+            result = write_file.func(file_name=name, content=content)
+        return result
+
+    names = list(by_path)
+    return _format_batch(names, _run_batch(write_all, names))
+
+@tool
+def make_dirs(dir_names: list[str]) -> str:
+    """Make several directories in one call."""
+    return _format_batch(dir_names, _run_batch(lambda name: make_dir.func(dir_name=name), dir_names))
+
+@tool
+def list_dirs(dir_names: list[str]) -> str:
+    """List the contents of several directories in one call."""
+    return _format_batch(dir_names, _run_batch(lambda name: list_dir.func(dir_name=name), dir_names))
+
+# --- Terminal: one persistent shell per agent thread (cwd, env and venvs carry over) ---
+MAX_COMMAND_TIMEOUT = 600
+shell_sessions = ShellManager(BASE_DIR)
+
 @tool
-def run_terminal_command(command: str) -> str:
+def run_terminal_command(command: str, timeout: int = 60) -> str:
     """
     Run a terminal command.
     Use this to create directories, install dependencies, run tests, etc.
+    Runs in a persistent shell: `cd`, exported variables and activated virtualenvs
+    carry over to later commands. A command is stopped after `timeout` seconds
+    (max 600) without resetting the shell; run `exit` to start a fresh shell.
     """
+    timeout = max(1, min(timeout, MAX_COMMAND_TIMEOUT))
+    if not shutil.which("bash"):
+        return _run_one_off(command, timeout)
+    # Commands run in a subshell, so a bare `exit` would only leave that; reset the session instead
+    if command.strip().split()[:1] == ["exit"] and len(command.split()) <= 2:
+        shell_sessions.reset(current_thread_id())
+        return "Shell reset: the next command starts a fresh shell in the workspace."
+    try:
+        session = shell_sessions.get(current_thread_id(), cwd=workspace_dir())
+        code, output, errors, timed_out = session.run(command, timeout=timeout)
+    except Exception as e:
+        return f"Error executing command: {e}"
+    if errors.strip():
+        output += f"\nError Output:\n{errors}"
+    if timed_out:
+        output += f"\n[Command stopped after {timeout}s]"
+    elif code:
+        output += f"\n[Exit code {code}]"
+    return output if output.strip() else "Command executed successfully (no output)."
+
+def _run_one_off(command: str, timeout: int) -> str:
+    """Fallback for systems without bash: a fresh shell per command."""
     try:
         result = subprocess.run(
             command,
             shell=True,
-            cwd=str(BASE_DIR),
+            cwd=str(workspace_dir()),
             capture_output=True,
             text=True,
-            timeout=60
+            timeout=timeout
         )
         output = result.stdout
         if result.stderr:
@@ -98,17 +376,112 @@ def run_terminal_command(command: str) -> str:
     except Exception as e:
         return f"Error executing command: {e}"
 
+# --- Background jobs: long-running commands that don't block the turn ---
+job_manager = JobManager(BASE_DIR / ".agentic_jobs")
+
+@tool
+def start_job(command: str, cwd: str = ".") -> str:
+    """
+    Start a long-running command in the background (installs, test suites, dev servers)
+    and return its job id right away. Keep working, then check it with `job_output`.
+    """
+    try:
+        job = job_manager.start(current_thread_id(), command, str(resolve_path(cwd)))
+        return f"Started {job.id}: {command}"
+    except (JobError, ValueError) as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error starting job: {e}"
+
+@tool
+def job_status(job_id: str | None = None) -> str:
+    """Show the status of one background job, or of all jobs when no id is given."""
+    try:
+        jobs = [job_manager.get(current_thread_id(), job_id)] if job_id else job_manager.list(current_thread_id())
+    except JobError as e:
+        return f"Error: {e}"
+    return "\n".join(job.summary() for job in jobs) if jobs else "No jobs."
+
+@tool
+def job_output(job_id: str, offset: int = 0, max_bytes: int = 8000, wait: float = 0) -> str:
+    """
+    Read a job's output from byte `offset`; pass the returned next offset to continue.
+    A negative offset reads the last bytes (e.g. -4000 for a tail).
+    `wait` blocks up to that many seconds (max 60) for new output or for the job to end.
+    """
+    try:
+        job, text, next_offset, skipped = job_manager.read(
+            current_thread_id(), job_id, offset, max(1, min(max_bytes, 64000)), max(0, min(wait, 60))
+        )
+    except JobError as e:
+        return f"Error: {e}"
+    header = job.summary() + f"\nNext offset: {next_offset}"
+    if skipped:
+        header += f"\n[{skipped} older bytes were rotated out of the log]"
+    return f"{header}\n---\n{text}" if text else f"{header}\n(no new output)"
+
+@tool
+def cancel_job(job_id: str) -> str:
+    """Stop a background job and everything it started."""
+    try:
+        return job_manager.cancel(current_thread_id(), job_id).summary()
+    except JobError as e:
+        return f"Error: {e}"
+
+# --- Spilled tool output: large results are stored on disk and paged in on demand ---
+spill_store = SpillStore(BASE_DIR / ".agentic_spill")
+
+def release_workspace(thread_id: str) -> None:
+    """Forget a thread's workspace mapping, index, shell and background jobs once its work is finished."""
+    root = workspaces.pop(thread_id, None)
+    if root is not None:
+        _extra_indexes.pop(root, None)
+    shell_sessions.reset(thread_id)
+    job_manager.cancel_owner(thread_id)
+
+@tool
+def read_spill(handle: str, offset: int = 0, length: int = 8000) -> str:
+    """
+    Page through a tool output that was too large to show in full.
+    `handle` is the spill:... id from the truncated result; continue from the returned next offset.
+    """
+    try:
+        text, next_offset, total = spill_store.read(handle, offset, max(1, min(length, 12000)))
+    except KeyError as e:
+        return f"Error: {e.args[0]}"
+    more = f"next offset {next_offset}" if next_offset < total else "end of output"
+    return f"[{handle} bytes {offset}-{next_offset} of {total}, {more}]\n{text}"
+
 @tool
 def web_search(query: str) -> str:
     """
     Search the web for documentation, solutions, or information.
     """
     try:
-        from duckduckgo_search import DDGS
-        results = DDGS().text(query, max_results=5)
+        results = cached_search(query, max_results=5)
         if not results:
             return "No results found."
-        return "\n\n".join([f"Title: {r['title']}\nURL: {r['href']}\nSnippet: {r['body']}" for r in results])
+        return format_results(results)
+    except Exception as e:
+        return f"Error searching web: {e}"
+
+@tool
+def web_search_batch(queries: list[str]) -> str:
+    """
+    Search the web for several queries at once (runs them in parallel).
+    Prefer this over repeated web_search calls. Duplicate results are removed.
+    """
+    try:
+        results = batch_search(queries, max_results=5)
+        if not results:
+            return "No results found."
+        parts = []
+        for r in results:
+            if "error" in r:
+                parts.append(f"Query: {r['query']}\nError searching web: {r['error']}")
+            else:
+                parts.append(f"Query: {r['query']}\n" + format_results([r]))
+        return "\n\n".join(parts)
     except Exception as e:
         return f"Error searching web: {e}"
 
@@ -117,16 +490,16 @@ def create_plan(plan_name: str, steps: str) -> str:
     """
     Create a structured plan file (e.g., plan.md).
     steps: A newline-separated list of steps.
+    Each step gets a stable id (#1, #2, ...) used by the other plan tools.
     """
-    file_path = BASE_DIR / plan_name
-    content = f"# Plan: {plan_name}\n\n"
-    for step in steps.split("\n"):
-        if step.strip():
-            content += f"- [ ] {step.strip()}\n"
-    
-    with open(file_path, 'w') as f:
-        f.write(content)
-    return f"Successfully created plan at {file_path}"
+    try:
+        file_path = resolve_path(plan_name)
+        with plan_lock(file_path):
+            plan = Plan.create(file_path, steps.split("\n"))
+            plan.save()
+        return f"Successfully created plan at {file_path}\n{format_steps(plan.steps)}"
+    except (PlanError, ValueError, OSError) as e:
+        return f"Error: {e}"
 
 @tool
 def update_plan(plan_name: str, step_index: int, status: str) -> str:
@@ -134,34 +507,59 @@ def update_plan(plan_name: str, step_index: int, status: str) -> str:
     Update a step in the plan.
     step_index: 0-based index of the step to update.
     status: 'done' (turns [ ] into [x]) or 'pending' (turns [x] into [ ]).
+    Prefer update_plan_steps to update several steps by id at once.
     """
-    file_path = BASE_DIR / plan_name
-    if not file_path.exists():
-        return f"Error: Plan {file_path} does not exist."
-    
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    step_count = 0
-    new_lines = []
-    updated = False
-    
-    for line in lines:
-        if line.strip().startswith("- ["):
-            if step_count == step_index:
-                if status == 'done':
-                    line = line.replace("- [ ]", "- [x]")
-                elif status == 'pending':
-                    line = line.replace("- [x]", "- [ ]")
-                updated = True
-            step_count += 1
-        new_lines.append(line)
-        
-    if not updated:
-        return f"Error: Step index {step_index} not found or invalid."
-        
-    with open(file_path, 'w') as f:
-        f.writelines(new_lines)
-    return f"Successfully updated step {step_index} to {status}"
+    try:
+        file_path = resolve_path(plan_name)
+        edit_plan(file_path, lambda plan: plan.set_status([plan.step_by_index(step_index)["id"]], status))
+        return f"Successfully updated step {step_index} to {status}"
+    except (PlanError, ValueError, OSError) as e:
+        return f"Error: {e}"
 
+@tool
+def update_plan_steps(plan_name: str, step_ids: list[str], status: str) -> str:
+    """
+    Set the status of several plan steps at once.
+    step_ids: step ids such as ["1", "2", "5"].
+    status: 'pending', 'in_progress', 'done' or 'skipped'.
+    Returns the next pending step.
+    """
+    try:
+        file_path = resolve_path(plan_name)
+        plan, _ = edit_plan(file_path, lambda plan: plan.set_status(step_ids, status))
+        nxt = plan.next_pending()
+        following = f"Next pending: {format_steps([nxt])}" if nxt else "All steps are complete."
+        return f"Successfully marked {len(step_ids)} step(s) as {status}.\n{following}"
+    except (PlanError, ValueError, OSError) as e:
+        return f"Error: {e}"
+
+@tool
+def add_plan_steps(plan_name: str, steps: str, after_id: str | None = None) -> str:
+    """
+    Insert new steps into a plan. Existing step ids do not change.
+    steps: A newline-separated list of steps.
+    after_id: insert after this step id (default: append at the end).
+    """
+    try:
+        file_path = resolve_path(plan_name)
+        _, added = edit_plan(file_path, lambda plan: plan.add_steps(steps.split("\n"), after_id))
+        return f"Added {len(added)} step(s):\n{format_steps(added)}"
+    except (PlanError, ValueError, OSError) as e:
+        return f"Error: {e}"
 
+@tool
+def get_plan_steps(plan_name: str, status: str | None = None, next_pending: bool = False) -> str:
+    """
+    Read plan steps without parsing the markdown.
+    status: only return steps with this status ('pending', 'in_progress', 'done', 'skipped').
+    next_pending: only return the first pending step.
+    """
+    try:
+        plan = Plan.load(resolve_path(plan_name))
+    except (PlanError, ValueError, OSError) as e:
+        return f"Error: {e}"
+    if next_pending:
+        nxt = plan.next_pending()
+        return format_steps([nxt]) if nxt else "All steps are complete."
+    steps = plan.filter(status)
+    return format_steps(steps) if steps else "No matching steps."
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+@dataclass
+class Span:
+    """One timed model call or tool call."""
+    kind: str  # "model" or "tool"
+    name: str
+    thread_id: str | None
+    turn: int
+    start: float
+    duration: float | None = None
+    input_size: int = 0
+    output_size: int = 0
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class TurnSummary:
+    turn: int
+    wall: float = 0.0
+    model_time: float = 0.0
+    tool_time: float = 0.0
+    model_calls: int = 0
+    tool_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    errors: int = 0
+    by_tool: dict[str, float] = field(default_factory=dict)
+
+    def format(self) -> str:
+        other = max(self.wall - self.model_time - self.tool_time, 0.0)
+        lines = [
+            f"Turn {self.turn}: {self.wall:.2f}s wall",
+            f"  model: {self.model_time:.2f}s over {self.model_calls} call(s), "
+            f"{self.input_tokens} in / {self.output_tokens} out tokens",
+            f"  tools: {self.tool_time:.2f}s over {self.tool_calls} call(s)",
+        ]
+        for name, seconds in sorted(self.by_tool.items(), key=lambda kv: -kv[1]):
+            lines.append(f"    {name}: {seconds:.2f}s")
+        lines.append(f"  other (agent loop, I/O): {other:.2f}s")
+        if self.errors:
+            lines.append(f"  errors: {self.errors}")
+        return "\n".join(lines)
+
+
+class Tracer(BaseCallbackHandler):
+    """
+    LangChain callback handler that records spans for model and tool calls.
+
+    Attach it to the chat model and to each tool; finished spans are kept
+    in a bounded in-memory buffer (for the TUI) and appended to a JSONL file
+    when `path` is set.
+    """
+
+    def __init__(self, path: str | None = None, keep: int = 500):
+        self.path = path
+        self.spans: deque[Span] = deque(maxlen=keep)
+        self.finished = 0
+        self._open: dict = {}
+        self._turns: dict[str, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    # --- Turns ---
+    def begin_turn(self, thread_id: str) -> int:
+        with self._lock:
+            turn = self._turns.get(thread_id, (0, 0.0))[0] + 1
+            self._turns[thread_id] = (turn, time.perf_counter())
+            return turn
+
+    def forget(self, thread_id: str) -> None:
+        """Drop a thread's turn counter (its finished spans age out of the buffer)."""
+        with self._lock:
+            self._turns.pop(thread_id, None)
+
+    def _current_turn(self, thread_id: str | None) -> int:
+        return self._turns.get(thread_id or "", (0, 0.0))[0]
+
+    def turn_summary(self, thread_id: str, turn: int | None = None) -> TurnSummary:
+        with self._lock:
+            current, started = self._turns.get(thread_id, (0, 0.0))
+            turn = turn or current
+            spans = [s for s in self.spans if s.thread_id == thread_id and s.turn == turn]
+        summary = TurnSummary(turn=turn)
+        if turn == current and started:
+            summary.wall = time.perf_counter() - started
+        if spans:
+            summary.wall = max(summary.wall, max(s.start + (s.duration or 0) for s in spans) - min(s.start for s in spans))
+        for s in spans:
+            if s.kind == "model":
+                summary.model_calls += 1
+                summary.model_time += s.duration or 0
+                summary.input_tokens += s.input_tokens or 0
+                summary.output_tokens += s.output_tokens or 0
+            else:
+                summary.tool_calls += 1
+                summary.tool_time += s.duration or 0
+                summary.by_tool[s.name] = summary.by_tool.get(s.name, 0) + (s.duration or 0)
+            summary.errors += 0 if s.ok else 1
+        return summary
+
+    def recent(self, kind: str | None = None, count: int = 5) -> list[Span]:
+        with self._lock:
+            spans = [s for s in self.spans if kind is None or s.kind == kind]
+        return spans[-count:]
+
+    # --- Span bookkeeping ---
+    def _start(self, run_id, kind: str, name: str, payload, metadata) -> None:
+        thread_id = (metadata or {}).get("thread_id")
+        thread_id = str(thread_id) if thread_id is not None else None
+        span = Span(
+            kind=kind,
+            name=name,
+            thread_id=thread_id,
+            turn=self._current_turn(thread_id),
+            start=time.perf_counter(),
+            input_size=len(str(payload)),
+        )
+        with self._lock:
+            self._open[run_id] = span
+
+    def _finish(self, run_id, output=None, error: BaseException | None = None, usage: dict | None = None) -> None:
+        with self._lock:
+            span = self._open.pop(run_id, None)
+        if span is None:
+            return
+        span.duration = time.perf_counter() - span.start
+        span.output_size = len(str(output)) if output is not None else 0
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        if usage:
+            span.input_tokens = usage.get("input_tokens")
+            span.output_tokens = usage.get("output_tokens")
+        with self._lock:
+            self.spans.append(span)
+            self.finished += 1
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({**asdict(span), "ts": time.time()}) + "\n")
+
+    # --- Callback hooks ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        name = (kwargs.get("invocation_params") or {}).get("model") or (serialized or {}).get("name", "model")
+        self._start(run_id, "model", name, messages, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = None
+        text = ""
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+                text += generation.text or ""
+        self._finish(run_id, text, usage=usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name", "tool"), input_str, metadata)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id, getattr(output, "content", output))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+
+def instrument_tools(tools: list, tracer: Tracer) -> list:
+    """Attach the tracer to every tool (keeps any callbacks already set)."""
+    for t in tools:
+        existing = list(t.callbacks or []) if isinstance(t.callbacks, list) else []
+        if tracer not in existing:
+            t.callbacks = [*existing, tracer]
+    return tools
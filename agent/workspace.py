@@ -0,0 +1,182 @@
+import fnmatch
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+DEFAULT_IGNORES = {".git", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".pytest_cache", ".agentic_jobs", ".agentic_spill", "batch_workspaces"}
+MAX_INDEXED_BYTES = 2 * 1024 * 1024  # larger files are listed but not content-indexed
+
+
+@dataclass
+class FileEntry:
+    mtime_ns: int
+    size: int
+    trigrams: frozenset = field(default_factory=frozenset)
+    is_text: bool = True
+
+
+def trigrams(text: str) -> set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class WorkspaceIndex:
+    """
+    File index over a directory tree, refreshed incrementally by mtime.
+
+    Each refresh stats every file but only re-reads the files whose mtime or
+    size changed. Text files feed a trigram inverted index, so repeated
+    literal searches only open files that can possibly match.
+    """
+
+    def __init__(self, root: Path, ignores: set[str] = DEFAULT_IGNORES):
+        self.root = Path(root)
+        self.ignores = set(ignores)
+        self.files: dict[str, FileEntry] = {}
+        self.postings: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    # --- Indexing ---
+    def _walk(self):
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name in self.ignores:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+    def refresh(self) -> dict:
+        """Bring the index up to date; returns counts of added/changed/removed files."""
+        with self._lock:
+            seen = set()
+            added = changed = 0
+            for entry in self._walk():
+                rel = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue  # Deleted since the directory was listed
+                seen.add(rel)
+                old = self.files.get(rel)
+                if old and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+                    continue
+                if old:
+                    self._unpost(rel, old)
+                    changed += 1
+                else:
+                    added += 1
+                self.files[rel] = self._index_file(rel, entry.path, st)
+
+            removed = [rel for rel in self.files if rel not in seen]
+            for rel in removed:
+                self._unpost(rel, self.files.pop(rel))
+            return {"added": added, "changed": changed, "removed": len(removed), "total": len(self.files)}
+
+    def _index_file(self, rel: str, path: str, st) -> FileEntry:
+        entry = FileEntry(mtime_ns=st.st_mtime_ns, size=st.st_size)
+        if st.st_size > MAX_INDEXED_BYTES:
+            entry.is_text = False
+            return entry
+        text = self._read_text(path)
+        if text is None:
+            entry.is_text = False
+            return entry
+        entry.trigrams = frozenset(trigrams(text))
+        for gram in entry.trigrams:
+            self.postings.setdefault(gram, set()).add(rel)
+        return entry
+
+    def _unpost(self, rel: str, entry: FileEntry) -> None:
+        for gram in entry.trigrams:
+            paths = self.postings.get(gram)
+            if paths is not None:
+                paths.discard(rel)
+                if not paths:
+                    del self.postings[gram]
+
+    @staticmethod
+    def _read_text(path: str) -> str | None:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\x00" in data[:8192]:
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    # --- Queries ---
+    def tree(self, subdir: str = "", max_depth: int = 4) -> list[str]:
+        """Sorted relative paths under `subdir`, directories suffixed with '/'."""
+        self.refresh()
+        prefix = subdir.strip("/")
+        prefix = f"{prefix}/" if prefix and prefix != "." else ""
+        lines = set()
+        with self._lock:
+            paths = list(self.files)
+        for rel in paths:
+            if not rel.startswith(prefix):
+                continue
+            parts = rel[len(prefix):].split("/")
+            for depth in range(1, min(len(parts), max_depth) + 1):
+                is_dir = depth < len(parts)
+                lines.add("/".join(parts[:depth]) + ("/" if is_dir else ""))
+        return sorted(lines)
+
+    def glob(self, pattern: str) -> list[str]:
+        self.refresh()
+        with self._lock:
+            paths = list(self.files)
+        return sorted(rel for rel in paths if fnmatch.fnmatch(rel, pattern))
+
+    def candidates(self, query: str) -> set[str]:
+        """Files that contain every trigram of `query` (a superset of the true matches)."""
+        grams = trigrams(query)
+        # refresh() mutates the index under the lock; concurrent tool calls may search meanwhile
+        with self._lock:
+            if not grams:
+                return {rel for rel, e in self.files.items() if e.is_text}
+            result = None
+            for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+                paths = self.postings.get(gram, set())
+                result = set(paths) if result is None else result & paths
+                if not result:
+                    return set()
+            return result
+
+    def grep(self, query: str, regex: bool = False, pattern: str | None = None, max_results: int = 50) -> list[tuple[str, int, str]]:
+        """Return (path, line_number, line) matches; literal searches are case-insensitive."""
+        self.refresh()
+        if regex:
+            matcher = re.compile(query)
+            with self._lock:
+                files = {rel for rel, e in self.files.items() if e.is_text}
+            match = lambda line: matcher.search(line) is not None
+        else:
+            needle = query.lower()
+            files = self.candidates(query)
+            match = lambda line: needle in line.lower()
+        if pattern:
+            files = {rel for rel in files if fnmatch.fnmatch(rel, pattern)}
+
+        results = []
+        for rel in sorted(files):
+            text = self._read_text(str(self.root / rel))
+            if text is None:
+                continue
+            for number, line in enumerate(text.splitlines(), 1):
+                if match(line):
+                    results.append((rel, number, line.strip()[:200]))
+                    if len(results) >= max_results:
+                        return results
+        return results
@@ -0,0 +1,241 @@
+"""
+Headless batch runner: one agent task per line of a JSONL file.
+
+Each request runs on its own checkpointer thread and in its own workspace
+directory, several at a time. Results are appended to the output JSONL as
+soon as each request finishes; re-running with the same output file skips
+requests that already completed, so an interrupted batch resumes where it
+stopped.
+
+    python batch.py requests.jsonl --out results.jsonl --workers 4
+
+Input lines need an id ("request_id" or "id") and a prompt ("prompt", or
+"title" and "body").
+"""
+import argparse
+import hashlib
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent.schema import Context
+
+# Request ids become directory names
+SAFE_NAME = re.compile(r"[^\w.-]")
+
+
+class UsageCounter(BaseCallbackHandler):
+    """Counts model calls, tool calls and tokens for one request."""
+
+    def __init__(self):
+        self.model_calls = 0
+        self.tool_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs):
+        with self._lock:
+            self.model_calls += 1
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.output_tokens += usage.get("output_tokens", 0)
+
+    def on_tool_end(self, output, **kwargs):
+        with self._lock:
+            self.tool_calls += 1
+
+
+@dataclass
+class BatchReport:
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    wall: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def format(self) -> str:
+        ran = self.done + self.failed
+        lines = [f"{self.done} done, {self.failed} failed, {self.skipped} skipped (already done) in {self.wall:.1f}s"]
+        if ran and self.wall:
+            lines.append(f"  throughput: {ran / self.wall * 60:.1f} requests/min, "
+                         f"{(self.input_tokens + self.output_tokens) / self.wall:.0f} tokens/s")
+        if self.latencies:
+            cuts = statistics.quantiles(self.latencies, n=20) if len(self.latencies) > 1 else self.latencies * 19
+            lines.append(f"  latency: p50 {statistics.median(self.latencies):.1f}s, p95 {cuts[18]:.1f}s")
+        lines.append(f"  tokens: {self.input_tokens} in / {self.output_tokens} out")
+        return "\n".join(lines)
+
+
+def read_requests(path: Path):
+    """Yield requests one line at a time, so large files are never loaded whole."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {number}: {e}", file=sys.stderr)
+                continue
+            request_id = request.get("request_id") or request.get("id")
+            if not request_id:
+                print(f"Skipping line {number}: no request_id", file=sys.stderr)
+                continue
+            yield str(request_id), request
+
+
+def completed_ids(out_path: Path) -> set[str]:
+    """Ids with an "ok" result in an earlier (possibly interrupted) run."""
+    done = set()
+    if not out_path.exists():
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from a crash
+            if result.get("status") == "ok":
+                done.add(str(result.get("request_id")))
+    return done
+
+
+def prompt_for(request: dict) -> str:
+    if request.get("prompt"):
+        return request["prompt"]
+    return "\n\n".join(part for part in (request.get("title"), request.get("body")) if part)
+
+
+def workspace_name(request_id: str) -> str:
+    """A directory name for the request: readable, and distinct even for ids that sanitize alike."""
+    digest = hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:10]
+    safe = SAFE_NAME.sub("_", request_id).strip(".")[:60]
+    return f"{safe}-{digest}" if safe else digest
+
+
+def run_request(agent, request_id: str, request: dict, workspace_root: Path, recursion_limit: int) -> dict:
+    from agent import tools
+    from agent.ai_agent import release_thread
+
+    # A fresh thread per attempt, so a retried request never resumes a failed conversation
+    thread_id = f"batch-{request_id}-{uuid.uuid4().hex[:8]}"
+    workspace = (workspace_root / workspace_name(request_id)).resolve()
+    workspace.mkdir(parents=True, exist_ok=True)
+    tools.workspaces[thread_id] = workspace
+    usage = UsageCounter()
+    result = {"request_id": request_id, "thread_id": thread_id, "workspace": str(workspace), "started": time.time()}
+    started = time.perf_counter()
+    try:
+        response = agent.invoke(
+            {"messages": [{"role": "user", "content": prompt_for(request)}]},
+            config={"configurable": {"thread_id": thread_id}, "callbacks": [usage], "recursion_limit": recursion_limit},
+            context=Context(user_id="batch", session_id=thread_id),
+        )
+        reply = response.get("structured_response") or response["messages"][-1].content
+        result.update(status="ok", reply=str(reply).strip())
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        release_thread(thread_id)
+    result.update(
+        wall_s=round(time.perf_counter() - started, 3),
+        model_calls=usage.model_calls,
+        tool_calls=usage.tool_calls,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+    )
+    return result
+
+
+def run_batch(
+    agent,
+    requests_path: Path,
+    out_path: Path,
+    workspace_root: Path,
+    workers: int = 4,
+    recursion_limit: int = 150,
+    on_result=None,
+) -> BatchReport:
+    report = BatchReport()
+    done_before = completed_ids(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_lock = threading.Lock()
+    # At most this many requests are read ahead of the workers
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    def work(request_id, request):
+        try:
+            result = run_request(agent, request_id, request, workspace_root, recursion_limit)
+            with write_lock:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                if result["status"] == "ok":
+                    report.done += 1
+                else:
+                    report.failed += 1
+                report.latencies.append(result["wall_s"])
+                report.input_tokens += result["input_tokens"]
+                report.output_tokens += result["output_tokens"]
+            if on_result:
+                on_result(result)
+        finally:
+            slots.release()
+
+    started = time.perf_counter()
+    with open(out_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        seen = set()
+        for request_id, request in read_requests(requests_path):
+            if request_id in done_before or request_id in seen:
+                report.skipped += 1
+                continue
+            seen.add(request_id)
+            slots.acquire()
+            pool.submit(work, request_id, request)
+    report.wall = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("requests", type=Path, help="JSONL file with one request per line")
+    parser.add_argument("--out", type=Path, default=Path("batch_results.jsonl"))
+    parser.add_argument("--workspaces", type=Path, default=Path("batch_workspaces"),
+                        help="each request works in <workspaces>/<request_id>-<hash>")
+    parser.add_argument("--workers", type=int, default=4, help="requests run at the same time")
+    parser.add_argument("--recursion-limit", type=int, default=150)
+    args = parser.parse_args()
+
+    from agent.ai_agent import build_agent, checkpointer
+    from agent.tools import job_manager, shell_sessions
+
+    def progress(result):
+        detail = result.get("error") or f"{result['wall_s']:.1f}s, {result['tool_calls']} tool calls"
+        print(f"[{result['status']}] {result['request_id']}: {detail}", flush=True)
+
+    try:
+        report = run_batch(build_agent(), args.requests, args.out, args.workspaces, args.workers,
+                           args.recursion_limit, on_result=progress)
+    finally:
+        if hasattr(checkpointer, "close"):
+            checkpointer.close()
+        shell_sessions.close_all()
+        job_manager.close_all()
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Deterministic chat model that replays preset tool calls, for offline benchmarks."""
+import itertools
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+def tool_step(name: str, **args) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "placeholder"}])
+
+
+def final_step(action: str = "done", explanation: str = "Finished.") -> AIMessage:
+    """The structured-output call that ends a turn (ToolStrategy uses the schema's class name)."""
+    return tool_step("ResponseFormat", action=action, explanation=explanation)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Returns the messages in `script` one per call, cycling when `cycle` is set.
+    Tool call ids are rewritten so every call is unique, and `bind_tools`
+    is a no-op, so it plugs straight into `create_agent`. `delay` stands in
+    for model latency.
+    """
+
+    script: list[AIMessage]
+    cycle: bool = True
+    delay: float = 0.0
+    _counter: itertools.count = PrivateAttr(default_factory=itertools.count)
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.delay:
+            time.sleep(self.delay)
+        index = self.calls
+        self.calls += 1
+        if index >= len(self.script) and not self.cycle:
+            raise IndexError("ScriptedChatModel ran out of scripted messages.")
+        template = self.script[index % len(self.script)]
+        message = template.model_copy(
+            update={
+                "tool_calls": [
+                    {**call, "id": f"call_{next(self._counter)}"} for call in template.tool_calls
+                ]
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,167 @@
+"""
+Fault-injecting fake of an OpenAI-compatible chat endpoint (stdlib only).
+
+A fraction of requests get a 429 with Retry-After, a 503, or a stall before
+answering; the rest return a canned completion. Point AGENTIC_LOCAL_MODEL_URL
+at it to exercise the agent's retry path, or run the built-in demo, which
+drives agent.resilience.ResilientCaller against it and prints the outcome:
+
+    python -m benchmarks.fault_server --demo --requests 200 --rate-429 0.2 --rate-5xx 0.05
+    python -m benchmarks.fault_server --port 8099   # serve only
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent.resilience import ResilientCaller, RetryPolicy
+
+
+class Faults:
+    def __init__(self, rate_429=0.2, rate_5xx=0.05, rate_stall=0.02, stall=2.0, latency=0.02, retry_after=0.2):
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.rate_stall = rate_stall
+        self.stall = stall
+        self.latency = latency
+        self.retry_after = retry_after
+        self.counts = {"ok": 0, "429": 0, "5xx": 0, "stall": 0}
+        self._lock = threading.Lock()
+
+    def pick(self) -> str:
+        roll = random.random()
+        if roll < self.rate_429:
+            outcome = "429"
+        elif roll < self.rate_429 + self.rate_5xx:
+            outcome = "5xx"
+        elif roll < self.rate_429 + self.rate_5xx + self.rate_stall:
+            outcome = "stall"
+        else:
+            outcome = "ok"
+        with self._lock:
+            self.counts[outcome] += 1
+        return outcome
+
+
+def make_handler(faults: Faults):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict | None = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            outcome = faults.pick()
+            if outcome == "429":
+                return self._send(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                                  {"Retry-After": str(faults.retry_after)})
+            if outcome == "5xx":
+                return self._send(503, {"error": {"message": "Service unavailable", "type": "overloaded"}})
+            time.sleep(faults.stall if outcome == "stall" else faults.latency)
+            self._send(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "model": "fake",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "ok"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+
+    return Handler
+
+
+def start(faults: Faults, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(faults))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def chat(url: str, timeout: float = 10.0) -> dict:
+    body = json.dumps({"model": "fake", "messages": [{"role": "user", "content": "hi"}]}).encode()
+    request = urllib.request.Request(f"{url}/chat/completions", data=body,
+                                     headers={"Content-Type": "application/json"})
+    # HTTPError carries `code` and `headers`, which is all classify_error needs
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def demo(faults: Faults, requests: int, concurrency: int, hedge: bool) -> dict:
+    server = start(faults)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    caller = ResilientCaller(RetryPolicy(max_attempts=6, base_delay=0.05), max_concurrency=concurrency,
+                             hedge=hedge, min_samples=10)
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            caller.call(lambda: chat(url), hedge_fn=lambda: chat(url))
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency * 2) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies.sort()
+    pct = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] if latencies else None
+    return {
+        "requests": requests,
+        "succeeded": len(latencies),
+        "failed": errors,
+        "elapsed_s": elapsed,
+        "p50_s": pct(0.50),
+        "p99_s": pct(0.99),
+        "server": faults.counts,
+        "caller": caller.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--demo", action="store_true", help="run a client against an in-process server and exit")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hedge", action="store_true")
+    parser.add_argument("--rate-429", type=float, default=0.2)
+    parser.add_argument("--rate-5xx", type=float, default=0.05)
+    parser.add_argument("--rate-stall", type=float, default=0.02)
+    parser.add_argument("--stall", type=float, default=2.0, help="seconds a stalled request hangs")
+    args = parser.parse_args()
+
+    faults = Faults(args.rate_429, args.rate_5xx, args.rate_stall, args.stall)
+    if args.demo:
+        print(json.dumps(demo(faults, args.requests, args.concurrency, args.hedge), indent=2))
+        return
+    server = start(faults, port=args.port)
+    print(f"Fault server on http://127.0.0.1:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Load test for server.py against the real agent graph with a scripted model
+(no network): middleware, checkpointer and streaming costs are all included.
+
+    python -m benchmarks.server_load --sessions 50 --turns 5 --workers 16
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from server import serve
+
+
+async def _request(host: str, port: int, method: str, path: str, payload: dict | None = None):
+    """Send one request; returns (status, [parsed JSON lines]) and the time to first byte."""
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload or {}).encode()
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    started = time.perf_counter()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        key, _, value = line.decode().partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    lines = []
+    first_byte = None
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            if size == 0:
+                break
+            lines.append(json.loads(await reader.readexactly(size)))
+            await reader.readline()
+    else:
+        lines.append(json.loads(await reader.readexactly(int(headers.get("content-length", 0)))))
+    writer.close()
+    return status, lines, first_byte
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(sessions: int = 50, turns: int = 5, workers: int = 16, think_time: float = 0.05, port: int = 0) -> dict:
+    from agent.ai_agent import build_agent, make_checkpointer
+    from benchmarks.fake_model import ScriptedChatModel, final_step
+
+    # One model call per turn: the model is shared by every session, so a multi-step
+    # script would hand steps of one conversation to another
+    model = ScriptedChatModel(script=[final_step(explanation="echo")], delay=think_time)
+    agent = build_agent(model=model, checkpointer=make_checkpointer("memory"))
+    server, manager = await serve(agent, "127.0.0.1", port, max_workers=workers, per_session_queue=turns)
+    host, port = server.sockets[0].getsockname()[:2]
+    latencies, ttfbs, errors = [], [], 0
+
+    async def user(n: int):
+        nonlocal errors
+        _, [created], _ = await _request(host, port, "POST", "/sessions", {"user_id": str(n)})
+        for t in range(turns):
+            started = time.perf_counter()
+            status, events, first_byte = await _request(
+                host, port, "POST", f"/sessions/{created['session_id']}/messages", {"message": f"hi {n}-{t}"}
+            )
+            if status != 200 or not events or events[-1].get("type") != "final":
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            ttfbs.append(first_byte)
+
+    started = time.perf_counter()
+    async with server:
+        await asyncio.gather(*(user(n) for n in range(sessions)))
+    elapsed = time.perf_counter() - started
+    await manager.close()
+
+    return {
+        "sessions": sessions,
+        "turns": sessions * turns,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_turns_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_s": statistics.median(latencies) if latencies else None,
+        "p99_s": _percentile(latencies, 99) if latencies else None,
+        "p50_ttfb_s": statistics.median(ttfbs) if ttfbs else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--think-time", type=float, default=0.05, help="scripted model latency per turn (s)")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.sessions, args.turns, args.workers, args.think_time))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cold-start benchmark: text mode vs voice mode.
+
+Each sample runs in a fresh interpreter so import caches don't leak between runs.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "agent_import": "import agent.ai_agent",
+    "text_mode": "import main",
+    # Imports only: load_voice_stack() would also open the microphone and prewarm gTTS over the network
+    "voice_mode": "import main, voice.capture, voice.tts, speech_recognition, pygame, gtts",
+}
+RUN_TIMEOUT = 120
+
+TIMER = """
+import time
+_t0 = time.perf_counter()
+{code}
+print(time.perf_counter() - _t0)
+"""
+
+
+def measure(code: str, runs: int) -> list[float]:
+    # Importing must not require a key; make sure we prove that. load_dotenv() never overrides
+    # a variable that is already set (even to ""), and the flag stops it reading .env at all.
+    env = {**os.environ, "GEMINI_API_KEY": "", "PYTHON_DOTENV_DISABLED": "1"}
+    samples = []
+    for _ in range(runs):
+        try:
+            result = subprocess.run(
+                [sys.executable, "-c", TIMER.format(code=code)],
+                cwd=str(ROOT),
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=RUN_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"timed out after {RUN_TIMEOUT}s")
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def run(runs: int = 5) -> dict:
+    report = {}
+    for name, code in SCENARIOS.items():
+        try:
+            samples = measure(code, runs)
+            report[name] = {
+                "median_s": statistics.median(samples),
+                "min_s": min(samples),
+                "runs": runs,
+            }
+        except RuntimeError as e:
+            report[name] = {"error": str(e)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the raw JSON report")
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for name, result in report.items():
+        if "error" in result:
+            print(f"{name:<14} error: {result['error']}")
+        else:
+            print(f"{name:<14} median {result['median_s'] * 1000:8.1f} ms   min {result['min_s'] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Offline benchmark suite: no network, no API key.
+
+Measures agent-loop overhead per step (build_agent + a scripted fake model),
+wall time of one step with many concurrent tool calls, throughput of every tool in agent/tools.py, checkpointer memory growth over
+N turns, and cold-start time. Results are written as JSON; pass --compare to
+flag regressions against an earlier run.
+
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --out new.json --compare bench.json --threshold 0.10
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Lower is better for every metric except these
+HIGHER_IS_BETTER = ("ops_per_s", "turns_per_s", "speedup")
+
+
+@contextlib.contextmanager
+def sandbox_workspace():
+    """Point the file tools at a throwaway directory and search at a local fake."""
+    from agent import search, tools
+    from agent.jobs import JobManager
+    from agent.spill import SpillStore
+    from agent.workspace import WorkspaceIndex
+
+    class FakeSearch:
+        def search(self, query, max_results=5):
+            return [{"title": query, "href": f"https://example.com/{i}", "body": "snippet"} for i in range(max_results)]
+
+    saved = (tools.BASE_DIR, tools.workspace_index, search._backend, tools.spill_store, tools.job_manager)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        tools.BASE_DIR = root
+        tools.workspace_index = WorkspaceIndex(root)
+        tools.spill_store = SpillStore(root / ".agentic_spill")
+        # Room for every job the tool benchmarks start, so none of them hits the per-thread limit
+        tools.job_manager = JobManager(root / ".agentic_jobs", max_per_owner=64)
+        search.set_search_backend(FakeSearch())
+        try:
+            yield root
+        finally:
+            tools.shell_sessions.close_all()
+            tools.job_manager.close_all()
+            tools.BASE_DIR, tools.workspace_index, _, tools.spill_store, tools.job_manager = saved
+            search.set_search_backend(saved[2])
+
+
+def _timeit(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - started
+
+
+# --- Agent loop ---
+def bench_agent_loop(steps: int = 20, turns: int = 5) -> dict:
+    """Wall time per agent step with a scripted model and a trivial tool call per step."""
+    from agent.ai_agent import build_agent, make_checkpointer
+    from agent.schema import Context
+    from benchmarks.fake_model import ScriptedChatModel, final_step, tool_step
+
+    with sandbox_workspace():
+        script = [tool_step("list_dir", dir_name=".")] * steps + [final_step()]
+        model = ScriptedChatModel(script=script)
+        agent = build_agent(model=model, checkpointer=make_checkpointer("memory"))
+        context = Context(user_id="bench")
+        started = time.perf_counter()
+        for turn in range(turns):
+            agent.invoke(
+                {"messages": [{"role": "user", "content": f"turn {turn}"}]},
+                config={"configurable": {"thread_id": f"bench-{turn}"}, "recursion_limit": steps * 3 + 10},
+                context=context,
+            )
+        elapsed = time.perf_counter() - started
+    total_steps = turns * (steps + 1)
+    return {"per_step_s": elapsed / total_steps, "turns_per_s": turns / elapsed, "steps": total_steps}
+
+
+# --- Parallel tool calls in one step ---
+def bench_parallel_tools(calls: int = 8, latency: float = 0.05) -> dict:
+    """One model step with `calls` independent web searches, each taking `latency` seconds."""
+    from langchain_core.messages import AIMessage
+    from agent import search
+    from agent.ai_agent import build_agent, make_checkpointer
+    from agent.schema import Context
+    from benchmarks.fake_model import ScriptedChatModel, final_step
+
+    class SlowSearch:
+        def search(self, query, max_results=5):
+            time.sleep(latency)
+            return [{"title": query, "href": "https://example.com", "body": "snippet"}]
+
+    step = AIMessage(content="", tool_calls=[
+        {"name": "web_search", "args": {"query": f"query {i}"}, "id": "placeholder"} for i in range(calls)
+    ])
+    with sandbox_workspace():
+        search.set_search_backend(SlowSearch())
+        agent = build_agent(model=ScriptedChatModel(script=[step, final_step()]), checkpointer=make_checkpointer("memory"))
+        started = time.perf_counter()
+        agent.invoke({"messages": [{"role": "user", "content": "search"}]},
+                     config={"configurable": {"thread_id": "parallel-bench"}}, context=Context(user_id="bench"))
+        elapsed = time.perf_counter() - started
+    return {"calls": calls, "step_s": elapsed, "serial_s": calls * latency, "speedup": calls * latency / elapsed}
+
+
+# --- Tools ---
+def tool_cases(root: Path) -> dict:
+    """Representative arguments for each tool; files are created on the fly."""
+    (root / "data.txt").write_text("".join(f"line {i} hello world\n" for i in range(2000)))
+    (root / "pkg").mkdir(exist_ok=True)
+    (root / "pkg" / "mod.py").write_text("def f():\n    return 1\n" * 50)
+    (root / "plan.md").write_text("")
+    from agent import tools
+    from agent.context import current_thread_id
+    handle = tools.spill_store.put("".join(f"log line {i}\n" for i in range(5000)))
+    counter = iter(range(10**9))
+    start = lambda command: tools.job_manager.start(current_thread_id(), command, str(root)).id
+    finished_job = start("sleep 0.1; echo x")
+    return {
+        "read_file": lambda: {"file_name": "data.txt", "context": None, "head": 50},
+        "file_info": lambda: {"file_name": "data.txt"},
+        "write_file": lambda: {"file_name": "out.txt", "content": "x" * 2048},
+        "edit_file": lambda: {"file_name": "pkg/mod.py", "search": "def f():\n    return 1\n" * 50,
+                              "replace": "def f():\n    return 1\n" * 50},
+        "apply_patch": lambda: {"file_name": "out.txt",
+                                "patch": "<<<<<<< SEARCH\n" + "x" * 2048 + "\n=======\n" + "x" * 2048 + "\n>>>>>>> REPLACE"},
+        "list_files": lambda: {"context": None},
+        "make_dir": lambda: {"dir_name": f"d/{next(counter)}"},
+        "delete_file": lambda: (root.joinpath("tmp.txt").write_text("x"), {"file_name": "tmp.txt"})[1],
+        "delete_dir": lambda: (root.joinpath("empty").mkdir(exist_ok=True), {"dir_name": "empty"})[1],
+        "list_dir": lambda: {"dir_name": "pkg"},
+        "read_files": lambda: {"file_names": ["data.txt", "pkg/mod.py"]},
+        "write_files": lambda: {"file_names": [f"w/{i}.txt" for i in range(8)], "contents": ["x" * 512] * 8},
+        "make_dirs": lambda: {"dir_names": [f"m/{next(counter)}" for _ in range(4)]},
+        "list_dirs": lambda: {"dir_names": ["pkg", "."]},
+        "tree": lambda: {"dir_name": ".", "max_depth": 3},
+        "glob_files": lambda: {"pattern": "*.py"},
+        "grep_files": lambda: {"query": "hello world", "max_results": 20},
+        "run_terminal_command": lambda: {"command": "echo hi"},
+        "start_job": lambda: {"command": "sleep 0.1; echo x"},
+        "job_status": lambda: {},
+        # The check before timing waits for the job to end; timed calls read the finished log
+        "job_output": lambda: {"job_id": finished_job, "wait": 5},
+        # Each call needs a running job, so starting it is part of the measured time
+        "cancel_job": lambda: {"job_id": start("sleep 30")},
+        "read_spill": lambda: {"handle": handle, "offset": 4000},
+        "web_search": lambda: {"query": f"python docs {next(counter) % 5}"},
+        "web_search_batch": lambda: {"queries": ["a", "b", "c"]},
+        "create_plan": lambda: {"plan_name": "plan.md", "steps": "\n".join(f"step {i}" for i in range(20))},
+        "update_plan": lambda: {"plan_name": "plan.md", "step_index": 3, "status": "done"},
+        "update_plan_steps": lambda: {"plan_name": "plan.md", "step_ids": ["1", "2", "3"], "status": "done"},
+        "add_plan_steps": lambda: {"plan_name": "plan.md", "steps": "extra"},
+        "get_plan_steps": lambda: {"plan_name": "plan.md", "next_pending": True},
+    }
+
+
+# Tools that start processes run fewer times; some outputs are checked once before timing
+SLOW_TOOLS = {"run_terminal_command", "start_job", "job_output", "cancel_job"}
+TOOL_CHECKS = {"start_job": "Started", "job_output": "\nx\n", "cancel_job": "cancelled"}
+
+
+def bench_tools(repeat: int = 50) -> dict:
+    from agent.ai_agent import TOOLS
+
+    results = {}
+    with sandbox_workspace() as root:
+        cases = tool_cases(root)
+        for t in TOOLS:
+            make_args = cases.get(t.name)
+            if make_args is None:
+                results[t.name] = {"skipped": "no benchmark case"}
+                continue
+            n = 5 if t.name in SLOW_TOOLS else repeat
+            expected = TOOL_CHECKS.get(t.name)
+            if expected and expected not in t.func(**make_args()):
+                raise AssertionError(f"{t.name}: output lacks {expected!r}")
+            # Call the undecorated function so we time the tool, not callback plumbing
+            elapsed = _timeit(lambda: t.func(**make_args()), n)
+            results[t.name] = {"per_call_s": elapsed / n, "ops_per_s": n / elapsed}
+    return results
+
+
+# --- Patching ---
+PATCH_CASES = {
+    # name: (unified diff against a 200-line file, the lines expected around the change)
+    "u3_replace": ("@@ -9,3 +9,3 @@\n line 9\n-line 10\n+LINE 10\n line 11\n", ["line 9", "LINE 10", "line 11"]),
+    # `git diff -U0` insertion: goes after line 10
+    "u0_insert": ("@@ -10,0 +11 @@\n+INS\n", ["line 9", "line 10", "INS", "line 11"]),
+    "u0_delete": ("@@ -10 +9,0 @@\n-line 10\n", ["line 9", "line 11"]),
+}
+
+
+def bench_patching(repeat: int = 200) -> dict:
+    """Apply unified diffs, checking each result before timing it."""
+    from agent.patching import apply_unified_diff
+
+    text = "".join(f"line {i}\n" for i in range(1, 201))
+    results = {}
+    for name, (diff, expected) in PATCH_CASES.items():
+        lines = apply_unified_diff(text, diff)[0].splitlines()
+        start = lines.index(expected[0])
+        if lines[start:start + len(expected)] != expected:
+            raise AssertionError(f"{name}: got {lines[start:start + len(expected)]}, expected {expected}")
+        elapsed = _timeit(lambda: apply_unified_diff(text, diff), repeat)
+        results[name] = {"per_call_s": elapsed / repeat, "ops_per_s": repeat / elapsed}
+    return results
+
+
+# --- Checkpointer memory ---
+def bench_checkpointer(turns: int = 200, backend: str = "memory") -> dict:
+    """Python heap growth (tracemalloc) while one thread accumulates `turns` turns."""
+    from agent.ai_agent import build_agent, make_checkpointer
+    from agent.schema import Context
+    from benchmarks.fake_model import ScriptedChatModel, final_step
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if backend == "sqlite":
+            from agent.checkpoint import SqliteCheckpointSaver
+            saver = SqliteCheckpointSaver(Path(tmp) / "bench.sqlite", keep_last=20)
+        else:
+            saver = make_checkpointer("memory")
+        agent = build_agent(model=ScriptedChatModel(script=[final_step()]), checkpointer=saver)
+        context = Context(user_id="bench")
+        config = {"configurable": {"thread_id": "memory-bench"}}
+
+        tracemalloc.start()
+        samples = []
+        started = time.perf_counter()
+        for turn in range(turns):
+            agent.invoke({"messages": [{"role": "user", "content": f"turn {turn} " + "x" * 200}]},
+                         config=config, context=context)
+            if turn % max(turns // 10, 1) == 0:
+                samples.append(tracemalloc.get_traced_memory()[0])
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        elapsed = time.perf_counter() - started
+        if hasattr(saver, "close"):
+            saver.close()
+
+        report = {
+            "backend": backend,
+            "turns": turns,
+            "heap_growth_bytes": current - samples[0],
+            "bytes_per_turn": (current - samples[0]) / max(turns - 1, 1),
+            "peak_bytes": peak,
+            "turns_per_s": turns / elapsed,
+        }
+        if backend == "sqlite":
+            report["reopen_resume_s"] = _reopen_and_resume(Path(tmp) / "bench.sqlite", config, context)
+    return report
+
+
+def _reopen_and_resume(path: Path, config: dict, context) -> float:
+    """Reopen the database as a new process would and run one more turn on the saved thread."""
+    from langgraph.checkpoint.serde.event_hooks import register_serde_event_listener
+    from agent.ai_agent import build_agent
+    from agent.checkpoint import SqliteCheckpointSaver
+    from agent.schema import ResponseFormat
+    from benchmarks.fake_model import ScriptedChatModel, final_step
+
+    # Types loaded without being on the serializer's allow-list
+    unregistered = []
+    unregister = register_serde_event_listener(
+        lambda event: unregistered.append(event) if event["kind"].startswith("msgpack_unregistered") else None
+    )
+    started = time.perf_counter()
+    saver = SqliteCheckpointSaver(path, keep_last=20)
+    try:
+        agent = build_agent(model=ScriptedChatModel(script=[final_step()]), checkpointer=saver)
+        before = len(agent.get_state(config).values["messages"])
+        result = agent.invoke({"messages": [{"role": "user", "content": "resume"}]}, config=config, context=context)
+    finally:
+        saver.close()
+        unregister()
+    elapsed = time.perf_counter() - started
+    if len(result["messages"]) <= before or not isinstance(result["structured_response"], ResponseFormat):
+        raise AssertionError("Reopened checkpointer did not resume the saved thread.")
+    if unregistered:
+        raise AssertionError(f"Checkpoint types missing from the allow-list: {unregistered}")
+    return elapsed
+
+
+# --- Startup ---
+def bench_startup(runs: int = 3) -> dict:
+    from benchmarks import startup
+    return startup.run(runs)
+
+
+# --- Runner and regression check ---
+def run_suite(quick: bool = False) -> dict:
+    report = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "time": time.time()},
+    }
+    sections = {
+        "agent_loop": lambda: bench_agent_loop(steps=5 if quick else 20, turns=2 if quick else 5),
+        "parallel_tools": lambda: bench_parallel_tools(),
+        "tools": lambda: bench_tools(repeat=10 if quick else 50),
+        "patching": lambda: bench_patching(repeat=50 if quick else 200),
+        "checkpointer_memory": lambda: bench_checkpointer(turns=30 if quick else 200),
+        "checkpointer_sqlite": lambda: bench_checkpointer(turns=30 if quick else 200, backend="sqlite"),
+        "startup": lambda: bench_startup(runs=1 if quick else 3),
+    }
+    for name, fn in sections.items():
+        try:
+            report[name] = fn()
+        except Exception as e:
+            report[name] = {"error": f"{type(e).__name__}: {e}"}
+    return report
+
+
+def _flatten(data, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list[str]:
+    """Return a line per metric that got worse by more than `threshold` (relative)."""
+    old, new = _flatten({k: v for k, v in baseline.items() if k != "meta"}), _flatten(
+        {k: v for k, v in current.items() if k != "meta"}
+    )
+    regressions = []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        if before == 0 or key.endswith((".runs", ".steps", ".turns", ".calls", ".serial_s")):
+            continue
+        change = (after - before) / abs(before)
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        if worse > threshold:
+            regressions.append(f"{key}: {before:.6g} -> {after:.6g} ({worse:+.1%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    parser.add_argument("--quick", action="store_true", help="smaller run sizes")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AGENTIC_CHECKPOINTER", "memory")
+    report = run_suite(quick=args.quick)
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), report, args.threshold)
+        if regressions:
+            print(f"⚠️  {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
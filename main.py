@@ -1,9 +1,7 @@
 import os
 import time
 import random
-import pygame
-import speech_recognition as sr
-from gtts import gTTS
+from types import SimpleNamespace
 import inquirer
 from rich.console import Console
 from rich.layout import Layout
@@ -12,33 +10,66 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.table import Table
 from rich.spinner import Spinner
-from textual.events import Key
-from agent.ai_agent import build_agent
+from agent.ai_agent import build_agent, checkpointer, context_budget, tool_budget
 from agent.schema import Context
-from agent.config import SYSTEM_PROMPT
+from agent.tools import job_manager, resolve_path, shell_sessions
+from agent.config import PLAN_WORKERS, SYSTEM_PROMPT, tracer
+from agent.orchestrator import run_plan
+from agent.streaming import stream_turn, TurnMetrics
+from tui import History, DirtyRenderer, Ticker, read_line_live
 
 # Initialize Rich console
 console = Console()
 
+# Keep only recent history in memory; set AGENTIC_HISTORY_SPILL to keep the full log on disk
+HISTORY_SIZE = int(os.getenv("AGENTIC_HISTORY_SIZE", "200"))
+HISTORY_SPILL = os.getenv("AGENTIC_HISTORY_SPILL")
+# Seconds to wait for an utterance before checking on the listener again
+LISTEN_TIMEOUT = float(os.getenv("AGENTIC_LISTEN_TIMEOUT", "30"))
+MAX_LISTENER_RESTARTS = 3
+
 # Global state
 class State:
     def __init__(self):
         self.current_tool = None
-        self.tool_history = []
-        self.messages = []
+        self.tool_history = History(HISTORY_SIZE, f"{HISTORY_SPILL}.tools.jsonl" if HISTORY_SPILL else None)
+        self.messages = History(HISTORY_SIZE, f"{HISTORY_SPILL}.messages.jsonl" if HISTORY_SPILL else None)
+        self.input_buffer = None
         self.thinking = False
         self.voice_mode = False
+        self.stream_mode = True
+        self.partial_reply = ""
+        self.running_tools = {}
+        self.last_metrics = None
+        self.thread_id = "interactive-session"
         self.thinking_lines = [
             "Okay, let me think.",
             "Hmm, interesting. Give me a second.",
             "Let's see what I can come up with.",
             "Alright, I'll think it through."
         ]
+        self.welcome_msg = "Hello! I'm your AI assistant. How can I help you today?"
+        self.goodbye_msg = "Goodbye! Have a great day!"
         
 state = State()
+renderer = None
+
+# --- Voice stack (loaded only in voice mode) ---
+voice = None
 
-# --- Initialize recognizer ---
-recognizer = sr.Recognizer()
+def load_voice_stack():
+    """Import the audio stack on first use; text mode never pays for it."""
+    global voice
+    if voice is None:
+        from voice.capture import BackgroundListener
+        from voice.tts import SpeechPipeline
+        pipeline = SpeechPipeline()
+        # Cache phrases we know we'll say so they play instantly
+        pipeline.prewarm([state.welcome_msg, state.goodbye_msg, *state.thinking_lines])
+        # Calibrates once, then keeps capturing while the agent works
+        listener = BackgroundListener().start()
+        voice = SimpleNamespace(tts=pipeline, listener=listener, restarts=0)
+    return voice
 
 # --- TUI Layout ---
 def make_layout() -> Layout:
@@ -59,7 +90,9 @@ def make_layout() -> Layout:
     return layout
 
 def generate_chat_panel():
-    messages = state.messages[-10:]  # Show last 10 messages
+    messages = state.messages.recent(10)  # Show last 10 messages
+    if state.partial_reply:
+        messages = (messages + [state.partial_reply + " ▌"])[-10:]
     content_parts = []
     for i, msg in enumerate(messages):
         icon = "🤖" if i % 2 else "👤"
@@ -84,20 +117,23 @@ def generate_tool_panel():
     table.add_column("Status", style="green")
     table.add_column("Time", style="yellow")
     
-    # Add current tool if any
-    if state.current_tool:
+    # Add tools that are currently running (streaming mode)
+    for name, started in state.running_tools.values():
         table.add_row(
-            state.current_tool,
-            "[yellow]Running[/yellow]" if state.thinking else "[green]Complete[/green]",
-            time.strftime("%H:%M:%S")
+            name,
+            "[yellow]Running[/yellow]",
+            f"{time.perf_counter() - started:.1f}s"
         )
-    
-    # Add tool history (most recent first)
-    for tool in reversed(state.tool_history[-5:]):
+
+    # Add finished tool and model calls with their measured durations (most recent first)
+    for span in reversed(tracer.recent(count=5)):
+        label = span.name if span.kind == "tool" else f"🧠 {span.name}"
+        if span.kind == "model" and span.output_tokens is not None:
+            label += f" ({span.input_tokens}→{span.output_tokens} tok)"
         table.add_row(
-            tool,
-            "[green]Complete[/green]",
-            time.strftime("%H:%M:%S")
+            label,
+            "[green]Complete[/green]" if span.ok else "[red]Error[/red]",
+            f"{span.duration:.2f}s"
         )
         
     status = "🔴 Idle"
@@ -110,58 +146,131 @@ def generate_tool_panel():
         table,
         title=f"Tool Activity - {status}",
         border_style="green",
-        padding=(1, 2)
+        padding=(1, 2),
+        subtitle=sidebar_subtitle()
     )
 
+def sidebar_subtitle():
+    """Latency and context-budget numbers for the last turn."""
+    parts = []
+    if state.last_metrics:
+        parts.append(state.last_metrics.summary())
+    stats = context_budget.stats.get(state.thread_id)
+    if stats:
+        parts.append(f"ctx: {stats.last_tokens_after} tok (saved {stats.last_saved})")
+    spill = tool_budget.stats.get(state.thread_id)
+    if spill and spill.spilled:
+        parts.append(f"spilled: {spill.bytes_kept_out // 1024} KiB kept out")
+    return " | ".join(parts) or None
+
 # --- Audio Playback ---
 def speak(text):
-    """Convert text to voice using Google TTS and play with pygame."""
+    """Speak text sentence by sentence; playback starts once the first sentence is synthesized."""
     if not state.voice_mode:
         return
         
-    with console.status("[yellow]Speaking...[/yellow]"):
-        tts = gTTS(text=text, lang="en")
-        tts.save("response.mp3")
-
-        pygame.mixer.init()
-        pygame.mixer.music.load("response.mp3")
-        pygame.mixer.music.play()
+    v = load_voice_stack()
+    v.listener.pause()  # Don't transcribe our own voice
+    try:
+        with console.status("[yellow]Speaking...[/yellow]"):
+            v.tts.speak(text)
+    finally:
+        v.listener.resume()
 
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
+def update_layout(layout: Layout):
+    """Update the TUI layout, rebuilding only the panels whose data changed."""
+    global renderer
+    if renderer is None or renderer.layout is not layout:
+        renderer = DirtyRenderer(layout)
 
-        pygame.mixer.quit()
-        os.remove("response.mp3")
+    changed = renderer.update(
+        "chat",
+        (state.messages.version, state.partial_reply),
+        generate_chat_panel,
+    )
+    stats = context_budget.stats.get(state.thread_id)
+    metrics = state.last_metrics
+    running = state.running_tools
+    changed |= renderer.update(
+        "sidebar",
+        (
+            state.tool_history.version,
+            tracer.finished,
+            state.current_tool,
+            state.thinking,
+            state.voice_mode,
+            # Running tools show elapsed time, so re-render them each tick
+            tuple(running),
+            time.monotonic() if running else None,
+            (id(metrics), metrics.first_token_at, metrics.finished_at, len(metrics.step_latencies)) if metrics else None,
+            stats.model_calls if stats else None,
+            tool_budget.thread_stats(state.thread_id).spilled,
+        ),
+        generate_tool_panel,
+    )
+    changed |= renderer.update(
+        "input",
+        (state.thinking, state.input_buffer),
+        generate_input_panel,
+    )
+    if changed:
+        renderer.refresh()
 
-def update_layout(layout: Layout):
-    """Update the TUI layout with current state"""
-    layout["chat"].update(generate_chat_panel())
-    layout["sidebar"].update(generate_tool_panel())
+def generate_input_panel():
     if state.thinking:
-        layout["input"].update(Panel(Spinner("dots"), title="Thinking...", border_style="yellow"))
-    else:
-        layout["input"].update(Panel("Type your message or 'exit' to quit", title="Input", border_style="blue"))
+        return Panel(Spinner("dots"), title="Thinking...", border_style="yellow")
+    if state.input_buffer is not None:
+        return Panel(Text(f"You: {state.input_buffer}▌"), title="✍️ Input", border_style="blue")
+    return Panel("Type your message or 'exit' to quit", title="Input", border_style="blue")
+
+def prompt_in_live(layout: Layout) -> str | None:
+    """Read a line inside the live screen; the input panel redraws on each keystroke."""
+    def on_change(buffer):
+        state.input_buffer = buffer
+        update_layout(layout)
+    return read_line_live(on_change)
 
 # --- Voice Input ---
 def listen():
-    """Listen to user's voice input and transcribe it."""
-    with sr.Microphone() as source:
-        print("\n🎙️ Listening...")
-        recognizer.adjust_for_ambient_noise(source)
-        audio = recognizer.listen(source)
+    """Return the next transcribed utterance from the background listener (None to ask again)."""
+    v = load_voice_stack()
+    if v.listener.finished.is_set() and v.listener.transcripts.empty():
+        # Capture stopped (microphone error or unplugged); start over a few times, then fall back to text
+        if v.restarts >= MAX_LISTENER_RESTARTS:
+            print("❌ The microphone keeps failing; switching to text input.")
+            state.voice_mode = False
+            return None
+        from voice.capture import BackgroundListener
+        v.restarts += 1
+        print("\n🎙️ Restarting the microphone...")
+        try:
+            v.listener = BackgroundListener().start()
+        except Exception as e:
+            print(f"❌ Could not open the microphone ({e}); switching to text input.")
+            state.voice_mode = False
+            return None
+    if not v.listener.calibrated.is_set():
+        print("\n🎙️ Calibrating microphone...")
+        v.listener.calibrated.wait()
+    print("\n🎙️ Listening...")
+    transcript = v.listener.get(timeout=LISTEN_TIMEOUT)
+    if transcript is None:
+        return None
 
-    try:
-        query = recognizer.recognize_google(audio)
-        print(f"👤 You said: {query}")
-        return query
-    except sr.UnknownValueError:
-        print("⚠️ Sorry, I didn’t catch that.")
-        speak("Sorry, I didn’t catch that. Please say it again.")
+    if transcript.error is not None and transcript.stage == "capture":
+        print(f"❌ Microphone error: {transcript.error}")
         return None
-    except sr.RequestError:
+    if transcript.error is not None:
         print("❌ Network error.")
         speak("I’m having trouble connecting to the speech service.")
         return None
+    v.restarts = 0
+    if not transcript.text:
+        print("⚠️ Sorry, I didn’t catch that.")
+        speak("Sorry, I didn’t catch that. Please say it again.")
+        return None
+    print(f"👤 You said: {transcript.text}")
+    return transcript.text
 
 # --- Initialize Agent ---
 def initialize_agent():
@@ -173,6 +282,8 @@ def initialize_agent():
     ]
     answers = inquirer.prompt(questions)
     state.voice_mode = answers['mode'] == 'Voice'
+    if state.voice_mode:
+        load_voice_stack()
     
     # Get system prompt
     questions = [
@@ -186,33 +297,81 @@ def initialize_agent():
     try:
         agent = build_agent(system_prompt)
         console.print("\n[green]🤖 AI Agent initialized successfully![/green]")
-        welcome_msg = "Hello! I'm your AI assistant. How can I help you today?"
-        state.messages.append(welcome_msg)
-        speak(welcome_msg)
+        state.messages.append(state.welcome_msg)
+        speak(state.welcome_msg)
         return agent
     except Exception as e:
         console.print(f"\n[red]❌ Failed to initialize Agent: {e}[/red]")
         exit(1)
 
+def run_streaming_turn(agent, user_input: str, config: dict, context: Context, layout: Layout):
+    """Stream one agent turn into the TUI and return the final response."""
+    metrics = TurnMetrics()
+    state.last_metrics = metrics
+    state.partial_reply = ""
+    state.running_tools = {}
+    reply = None
+
+    for event in stream_turn(agent, user_input, config, context, metrics):
+        if event.kind == "token":
+            state.partial_reply += event.text
+        elif event.kind == "tool_start":
+            state.current_tool = event.tool_name
+            key = event.tool_call_id or event.tool_name
+            # Replaced, never mutated: the ticker thread iterates whichever dict it last read
+            state.running_tools = {**state.running_tools, key: (event.tool_name, time.perf_counter())}
+        elif event.kind == "tool_end":
+            key = event.tool_call_id or event.tool_name
+            state.running_tools = {k: v for k, v in state.running_tools.items() if k != key}
+            state.tool_history.append(event.tool_name)
+        elif event.kind == "step":
+            # A new model step starts fresh partial text
+            state.partial_reply = ""
+        elif event.kind == "final":
+            reply = event.data
+        update_layout(layout)
+
+    state.partial_reply = ""
+    state.running_tools = {}
+    return reply
+
+def run_orchestrator(args: list[str], layout: Layout):
+    """`/orchestrate <plan.md> [workers]`: report each step as the workers finish it."""
+    if not args:
+        state.messages.append("Usage: /orchestrate <plan.md> [workers]")
+        update_layout(layout)
+        return
+
+    def on_event(message):
+        state.messages.append(message)
+        update_layout(layout)
+
+    state.thinking = True
+    try:
+        workers = int(args[1]) if len(args) > 1 else PLAN_WORKERS
+        report = run_plan(resolve_path(args[0]), workers, on_event=on_event)
+        state.messages.append(report.format())
+    except Exception as e:
+        state.messages.append(f"Error: {e}")
+    finally:
+        state.thinking = False
+        update_layout(layout)
+
 def handle_terminal_command(command: str, layout: Layout):
     """Handle terminal command execution with user permission"""
-    questions = [
-        inquirer.Confirm('execute',
-                        message=f"Do you want to execute this command: {command}?",
-                        default=False)
-    ]
-    with Live(layout, refresh_per_second=4, screen=False):
-        answers = inquirer.prompt(questions)
-        if answers and answers['execute']:
-            state.current_tool = "Terminal"
-            os.system(command)
-            state.tool_history.append("Terminal")
-            update_layout(layout)
+    state.messages.append(f"Run this command? {command}  (type y to confirm)")
+    update_layout(layout)
+    answer = prompt_in_live(layout)
+    if answer and answer.strip().lower() in {"y", "yes"}:
+        state.current_tool = "Terminal"
+        os.system(command)
+        state.tool_history.append("Terminal")
+        update_layout(layout)
 
 def main():
     # Initialize agent
     agent = initialize_agent()
-    config = {"configurable": {"thread_id": "interactive-session"}}
+    config = {"configurable": {"thread_id": state.thread_id}}
     context = Context(user_id="1")
     
     # Create initial layout
@@ -221,13 +380,17 @@ def main():
     layout["sidebar"].update(Panel("Initializing...", title="🔧 Tool Activity", border_style="green"))
     layout["input"].update(Panel("Type your message or 'exit' to quit", title="✍️ Input", border_style="blue"))
     
-    # Create Live display context
+    # Create Live display context; refreshes happen only when a panel changes
     live = Live(
         layout,
-        refresh_per_second=4,
+        auto_refresh=False,
         screen=True,  # Changed to True to take over the screen
         vertical_overflow="visible"
     )
+    global renderer
+    renderer = DirtyRenderer(layout, live)
+    # Animate the spinner and tool timers only while a turn is running
+    ticker = Ticker(lambda: (update_layout(layout), live.refresh()), lambda: state.thinking).start()
     
     try:
         # Start the live display
@@ -242,20 +405,28 @@ def main():
                     if not user_input:
                         continue
                 else:
-                    live.stop()  # Temporarily stop live display for input
-                    questions = [
-                        inquirer.Text('input',
-                                    message="You",
-                                    default="")
-                    ]
-                    answers = inquirer.prompt(questions)
-                    live.start()  # Restart live display
-                    if not answers:
+                    user_input = prompt_in_live(layout)
+                    if user_input is None:
+                        should_exit = True
+                        continue
+                    if not user_input.strip():
                         continue
-                    user_input = answers['input']
                 
+                if user_input.strip().lower() in {"/trace", "/summary"}:
+                    # Show where the last turn's time went
+                    state.messages.append(user_input)
+                    state.messages.append(tracer.turn_summary(state.thread_id).format())
+                    update_layout(layout)
+                    continue
+
+                if user_input.strip().lower().startswith("/orchestrate"):
+                    # Run the plan's independent steps on parallel worker agents
+                    state.messages.append(user_input)
+                    run_orchestrator(user_input.split()[1:], layout)
+                    continue
+
                 if user_input.lower() in {"bye", "exit", "quit"}:
-                    speak("Goodbye! Have a great day!")
+                    speak(state.goodbye_msg)
                     should_exit = True
                     continue
                 
@@ -264,30 +435,26 @@ def main():
                 update_layout(layout)
                 
                 # Process response
+                tracer.begin_turn(state.thread_id)
                 state.thinking = True
                 state.current_tool = None
                 update_layout(layout)
+                ticker.poke()
                 
                 try:
-                    # Invoke agent
-                    response = agent.invoke(
-                        {"messages": [{"role": "user", "content": user_input}]},
-                        config=config,
-                        context=context
-                    )
-                    
-                    # Extract response and tool information
-                    reply = response.get("structured_response", response)
+                    if state.stream_mode:
+                        # Stream tokens and tool events as they arrive
+                        reply = run_streaming_turn(agent, user_input, config, context, layout)
+                    else:
+                        # Invoke agent
+                        response = agent.invoke(
+                            {"messages": [{"role": "user", "content": user_input}]},
+                            config=config,
+                            context=context
+                        )
+                        reply = response.get("structured_response", response)
                     clean_reply = str(reply).strip()
                     
-                    # Track tool usage from response
-                    if hasattr(response, 'get') and response.get('tool_calls'):
-                        for tool_call in response['tool_calls']:
-                            tool_name = tool_call.get('name', 'Unknown Tool')
-                            state.current_tool = tool_name
-                            state.tool_history.append(tool_name)
-                            update_layout(layout)
-                    
                     # Check for terminal commands
                     if "```bash" in clean_reply or "```sh" in clean_reply:
                         try:
@@ -322,9 +489,15 @@ def main():
         should_exit = True
     finally:
         # Clean up
+        ticker.stop()
         live.stop()
-        if state.voice_mode:
-            pygame.mixer.quit()
+        if hasattr(checkpointer, "close"):
+            checkpointer.close()  # Flush batched checkpoints to disk
+        shell_sessions.close_all()
+        job_manager.close_all()
+        if state.voice_mode and voice is not None:
+            voice.listener.stop()
+            voice.tts.close()
         if should_exit:
             console.print("[blue]👋 Thank you for using AgenticAI![/blue]")
 
@@ -0,0 +1,351 @@
+"""
+Multi-session HTTP server for the agent.
+
+Each session gets its own Context and checkpointer thread (thread_id is the
+session id). Turns of one session run in order; different sessions run
+concurrently on a worker pool. Responses stream back as newline-delimited
+JSON over chunked HTTP.
+
+    python server.py --port 8765
+
+    POST /sessions                      -> {"session_id": "..."}
+    POST /sessions/<id>/messages        body {"message": "..."}  -> NDJSON event stream
+    GET  /health                        -> server stats
+
+Sessions idle for longer than --session-ttl seconds are dropped, along with
+their worker task, shell and per-thread stats; their checkpoints stay in the
+checkpointer.
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from agent.schema import Context
+from agent.streaming import stream_turn, TurnMetrics
+
+MAX_BODY_BYTES = 1 << 20
+
+
+@dataclass
+class Turn:
+    message: str
+    events: asyncio.Queue
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class Session:
+    context: Context
+    queue: asyncio.Queue
+    worker: asyncio.Task | None = None
+    last_active: float = field(default_factory=time.monotonic)
+    running: bool = False
+
+    def idle_for(self, now: float) -> float:
+        if self.running or not self.queue.empty():
+            return 0.0
+        return now - self.last_active
+
+
+class Overloaded(Exception):
+    """Raised to reject a request with an HTTP status: full queues, oversized or malformed requests."""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class SessionManager:
+    """
+    Maps session ids to agent threads and schedules their turns.
+
+    Backpressure: each session queues at most `per_session_queue` turns and
+    the server holds at most `max_pending` queued or running turns; beyond
+    that requests are rejected with 429/503 instead of piling up. Sessions
+    idle for `session_ttl` seconds are expired so their worker tasks do not
+    accumulate.
+    """
+
+    def __init__(
+        self,
+        agent,
+        max_workers: int = 8,
+        per_session_queue: int = 4,
+        max_pending: int = 256,
+        session_ttl: float = 1800.0,
+    ):
+        self.agent = agent
+        self.per_session_queue = per_session_queue
+        self.max_pending = max_pending
+        self.session_ttl = session_ttl
+        self.sessions: dict[str, Session] = {}
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self._reaper: asyncio.Task | None = None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-turn")
+        self._slots = asyncio.Semaphore(max_workers)
+
+    def create_session(self, user_id: str = "anonymous") -> Session:
+        context = Context(user_id=user_id)
+        session = Session(context=context, queue=asyncio.Queue(maxsize=self.per_session_queue))
+        session.worker = asyncio.create_task(self._session_worker(session))
+        self.sessions[context.session_id] = session
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._expire_idle())
+        return session
+
+    async def _expire_idle(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.session_ttl / 4, 60.0))
+            await self.expire_idle()
+
+    async def expire_idle(self) -> list[str]:
+        """Drop sessions idle for longer than `session_ttl`; returns their ids."""
+        from agent.ai_agent import release_thread
+
+        now = time.monotonic()
+        expired = [sid for sid, s in self.sessions.items() if s.idle_for(now) > self.session_ttl]
+        for session_id in expired:
+            session = self.sessions.pop(session_id)
+            session.worker.cancel()
+            self.expired += 1
+            # Closes the session's shell, cancels its background jobs and drops its stats
+            await asyncio.to_thread(release_thread, session_id)
+        return expired
+
+    def submit(self, session_id: str, message: str) -> Turn:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        if self.pending >= self.max_pending:
+            raise Overloaded(503, "Server is at capacity, retry later.")
+        turn = Turn(message=message, events=asyncio.Queue())
+        try:
+            session.queue.put_nowait(turn)
+        except asyncio.QueueFull:
+            raise Overloaded(429, "Too many queued messages for this session.")
+        self.pending += 1
+        session.last_active = time.monotonic()
+        return turn
+
+    async def _session_worker(self, session: Session) -> None:
+        loop = asyncio.get_running_loop()
+        config = {"configurable": {"thread_id": session.context.session_id}}
+        while True:
+            turn = await session.queue.get()
+            session.running = True
+            try:
+                async with self._slots:
+                    await loop.run_in_executor(
+                        self._pool, self._run_turn, loop, turn, config, session.context
+                    )
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                await turn.events.put({"type": "error", "error": str(e)})
+            finally:
+                self.pending -= 1
+                session.running = False
+                session.last_active = time.monotonic()
+                await turn.events.put(None)
+
+    def _run_turn(self, loop, turn: Turn, config: dict, context: Context) -> None:
+        """Runs on a worker thread; forwards stream events to the event loop."""
+        emit = lambda event: loop.call_soon_threadsafe(turn.events.put_nowait, event)
+        metrics = TurnMetrics()
+        emit({"type": "queued", "wait": metrics.started_at - turn.enqueued_at})
+        for event in stream_turn(self.agent, turn.message, config, context, metrics):
+            if event.kind == "token":
+                emit({"type": "token", "text": event.text})
+            elif event.kind in ("tool_start", "tool_end"):
+                emit({"type": event.kind, "tool": event.tool_name, "elapsed": event.elapsed})
+            elif event.kind == "final":
+                emit({
+                    "type": "final",
+                    "reply": str(event.data).strip(),
+                    "ttft": metrics.time_to_first_token,
+                    "total": metrics.total,
+                    "steps": [{"node": node, "latency": latency} for node, latency in metrics.step_latencies],
+                })
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+        }
+
+    async def close(self) -> None:
+        if self._reaper:
+            self._reaper.cancel()
+        for session in self.sessions.values():
+            if session.worker:
+                session.worker.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Minimal HTTP/1.1 handling (stdlib only) ---
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+               429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+async def _write_json(writer, status: int, payload: dict) -> None:
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+async def _stream_events(writer, turn: Turn) -> None:
+    writer.write(
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n"
+    )
+    while (event := await turn.events.get()) is not None:
+        line = (json.dumps(event) + "\n").encode()
+        writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        # drain() applies TCP backpressure from slow clients
+        await writer.drain()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode().split(" ", 2)
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            key, _, value = line.decode().partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+    except (ValueError, UnicodeDecodeError):
+        raise Overloaded(400, "Malformed request.")
+    if length < 0:
+        raise Overloaded(400, "Malformed request.")
+    if length > MAX_BODY_BYTES:
+        raise Overloaded(413, "Request body too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _json_body(body: bytes) -> dict | None:
+    """The request body as a JSON object, or None if it is not one."""
+    try:
+        data = json.loads(body or b"{}")
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def _post_message(manager: SessionManager, writer, session_id: str, body: bytes) -> None:
+    data = _json_body(body)
+    if data is None:
+        await _write_json(writer, 400, {"error": "Body must be a JSON object."})
+        return
+    message = data.get("message")
+    if not message or not isinstance(message, str):
+        await _write_json(writer, 400, {"error": "Missing 'message'."})
+        return
+    try:
+        turn = manager.submit(session_id, message)
+    except KeyError:
+        await _write_json(writer, 404, {"error": "Unknown session."})
+        return
+    except Overloaded as e:
+        await _write_json(writer, e.status, {"error": e.reason})
+        return
+    await _stream_events(writer, turn)
+
+
+def make_handler(manager: SessionManager):
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except Overloaded as e:
+                    await _write_json(writer, e.status, {"error": e.reason})
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                parts = [p for p in path.split("?")[0].split("/") if p]
+
+                if method == "GET" and parts == ["health"]:
+                    await _write_json(writer, 200, manager.stats())
+                elif method == "POST" and parts == ["sessions"]:
+                    data = _json_body(body)
+                    if data is None:
+                        await _write_json(writer, 400, {"error": "Body must be a JSON object."})
+                    else:
+                        session = manager.create_session(str(data.get("user_id", "anonymous")))
+                        await _write_json(writer, 200, {"session_id": session.context.session_id})
+                elif method == "POST" and len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages":
+                    await _post_message(manager, writer, parts[1], body)
+                else:
+                    await _write_json(writer, 404, {"error": "Not found."})
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(agent, host: str = "127.0.0.1", port: int = 8765, **manager_options):
+    """Start the server and return (asyncio.Server, SessionManager)."""
+    manager = SessionManager(agent, **manager_options)
+    server = await asyncio.start_server(make_handler(manager), host, port)
+    return server, manager
+
+
+async def _main(args) -> None:
+    from agent.ai_agent import build_agent, checkpointer
+    server, manager = await serve(
+        build_agent(),
+        args.host,
+        args.port,
+        max_workers=args.workers,
+        per_session_queue=args.queue,
+        session_ttl=args.session_ttl,
+    )
+    print(f"[AgenticAI] 🌐 Serving on http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await manager.close()
+        from agent.tools import job_manager, shell_sessions
+        shell_sessions.close_all()
+        job_manager.close_all()
+        if hasattr(checkpointer, "close"):
+            checkpointer.close()  # Flush batched checkpoints to disk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session agent server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8, help="max concurrent agent turns")
+    parser.add_argument("--queue", type=int, default=4, help="max queued turns per session")
+    parser.add_argument("--session-ttl", type=float, default=1800.0, help="seconds before an idle session expires")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,166 @@
+import json
+import os
+import sys
+import threading
+from collections import deque
+
+
+class History:
+    """
+    Fixed-size ring buffer for TUI history.
+
+    Only the newest `maxlen` items are kept in memory; `version` changes on
+    every append so renderers can skip work when nothing changed. When
+    `spill_path` is set, every item is also appended to a JSONL file so the
+    full history survives on disk.
+    """
+
+    def __init__(self, maxlen: int = 200, spill_path: str | None = None):
+        self._items = deque(maxlen=maxlen)
+        self.total = 0
+        self.version = 0
+        self.spill_path = spill_path
+
+    def append(self, item) -> None:
+        self._items.append(item)
+        self.total += 1
+        self.version += 1
+        if self.spill_path:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"n": self.total, "item": item}, default=str) + "\n")
+
+    def recent(self, count: int) -> list:
+        if count <= 0:
+            return []
+        return list(self._items)[-count:]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+
+class DirtyRenderer:
+    """Rebuilds a layout region only when its render key changes, then refreshes Live once."""
+
+    def __init__(self, layout, live=None):
+        self.layout = layout
+        self.live = live
+        self.rebuilds = 0
+        self._keys: dict[str, object] = {}
+        self._lock = threading.RLock()
+
+    def update(self, name: str, key, build) -> bool:
+        with self._lock:
+            if self._keys.get(name) == key:
+                return False
+            self._keys[name] = key
+            self.layout[name].update(build())
+            self.rebuilds += 1
+            return True
+
+    def refresh(self) -> None:
+        if self.live is not None:
+            self.live.refresh()
+
+
+class Ticker:
+    """Refreshes the display at a fixed rate only while `active()` is true (e.g. spinners, timers)."""
+
+    def __init__(self, tick, active, interval: float = 0.25):
+        self.tick = tick
+        self.active = active
+        self.interval = interval
+        self.last_error: Exception | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tui-ticker", daemon=True)
+
+    def start(self) -> "Ticker":
+        self._thread.start()
+        return self
+
+    def poke(self) -> None:
+        """Wake the ticker after `active()` may have become true."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self.active():
+                try:
+                    self.tick()
+                except Exception as e:
+                    # One failed redraw must not stop the ticker; the next tick tries again
+                    self.last_error = e
+                self._stop.wait(self.interval)
+            else:
+                # Sleep until poked; no CPU while idle
+                self._wake.wait()
+                self._wake.clear()
+
+
+def read_line_live(on_change) -> str | None:
+    """
+    Read a line from the terminal without leaving the Live screen.
+    `on_change(buffer)` is called after every keystroke so the input panel
+    can redraw. Returns None on EOF (Ctrl-D on an empty line).
+    """
+    if not sys.stdin.isatty():
+        line = sys.stdin.readline()
+        return line.rstrip("\n") if line else None
+
+    if os.name == "nt":
+        import msvcrt
+        getch = msvcrt.getwch
+        restore = lambda: None
+    else:
+        import termios
+        import tty
+        fd = sys.stdin.fileno()
+        saved = termios.tcgetattr(fd)
+        tty.setcbreak(fd)
+        getch = lambda: sys.stdin.read(1)
+        restore = lambda: termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+    buffer = ""
+    try:
+        on_change(buffer)
+        while True:
+            ch = getch()
+            if ch in ("\r", "\n"):
+                return buffer
+            if ch == "\x03":
+                raise KeyboardInterrupt
+            if ch == "\x04":
+                if not buffer:
+                    return None
+                continue
+            if ch in ("\x7f", "\b"):
+                buffer = buffer[:-1]
+            elif ch == "\x15":  # Ctrl-U clears the line
+                buffer = ""
+            elif ch == "\x1b":
+                # Swallow escape sequences such as arrow keys (ESC [ A)
+                if getch() == "[":
+                    while not (nxt := getch()).isalpha() and nxt != "~":
+                        pass
+                continue
+            elif ch in ("\x00", "\xe0"):
+                getch()  # Windows function-key prefix; skip its key code
+                continue
+            elif ch.isprintable():
+                buffer += ch
+            else:
+                continue
+            on_change(buffer)
+    finally:
+        restore()
+        on_change(None)
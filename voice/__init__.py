@@ -0,0 +1 @@
+# This file marks the 'voice' directory as a package.
@@ -0,0 +1,327 @@
+"""
+Background voice capture: calibrate once, segment speech with an energy VAD,
+and recognize utterances on a worker thread while the next one is captured.
+
+Offline benchmark against a WAV file:
+
+    python -m voice.capture recording.wav
+"""
+import array
+import math
+import queue
+import sys
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass
+
+CHUNK_FRAMES = 1024
+
+
+@dataclass
+class Utterance:
+    audio: bytes
+    sample_rate: int
+    sample_width: int
+    started_at: float
+    ended_at: float
+
+
+@dataclass
+class Transcript:
+    text: str | None
+    error: Exception | None = None
+    stage: str = "recognize"  # "capture" when the microphone loop failed
+    utterance_ended_at: float = 0.0
+    recognized_at: float = 0.0
+
+    @property
+    def latency(self) -> float:
+        """Time from end of speech to transcript."""
+        return self.recognized_at - self.utterance_ended_at
+
+
+# --- Audio sources ---
+class MicrophoneSource:
+    """Default microphone via speech_recognition/PyAudio."""
+
+    def __init__(self, chunk_frames: int = CHUNK_FRAMES):
+        import speech_recognition as sr
+        self._mic = sr.Microphone(chunk_size=chunk_frames)
+        self.chunk_frames = chunk_frames
+
+    def __enter__(self):
+        self._source = self._mic.__enter__()
+        self.sample_rate = self._source.SAMPLE_RATE
+        self.sample_width = self._source.SAMPLE_WIDTH
+        return self
+
+    def __exit__(self, *exc):
+        return self._mic.__exit__(*exc)
+
+    def read(self) -> bytes:
+        return self._source.stream.read(self.chunk_frames)
+
+
+class WavFileSource:
+    """Reads a WAV file in chunks; `realtime=True` paces reads like a live microphone."""
+
+    def __init__(self, path: str, realtime: bool = False, chunk_frames: int = CHUNK_FRAMES):
+        self.path = path
+        self.realtime = realtime
+        self.chunk_frames = chunk_frames
+
+    def __enter__(self):
+        self._wav = wave.open(self.path, "rb")
+        if self._wav.getnchannels() != 1:
+            raise ValueError("WavFileSource needs a mono WAV file.")
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = self._wav.getsampwidth()
+        return self
+
+    def __exit__(self, *exc):
+        self._wav.close()
+
+    def read(self) -> bytes:
+        data = self._wav.readframes(self.chunk_frames)
+        if self.realtime and data:
+            time.sleep(self.chunk_frames / self.sample_rate)
+        return data
+
+
+# --- Recognizers ---
+class GoogleRecognizer:
+    """speech_recognition's Google Web Speech API. Returns None when nothing was understood."""
+
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, utterance: Utterance) -> str | None:
+        audio = self.sr.AudioData(utterance.audio, utterance.sample_rate, utterance.sample_width)
+        try:
+            return self.recognizer.recognize_google(audio)
+        except self.sr.UnknownValueError:
+            return None
+
+
+class ScriptedRecognizer:
+    """Offline stand-in that returns preset transcripts in order (with optional delay)."""
+
+    def __init__(self, transcripts: list[str], delay: float = 0.0):
+        self.transcripts = deque(transcripts)
+        self.delay = delay
+
+    def recognize(self, utterance: Utterance) -> str | None:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.transcripts.popleft() if self.transcripts else None
+
+
+# --- Voice activity detection ---
+def rms(chunk: bytes, sample_width: int) -> float:
+    if sample_width == 2:
+        samples = array.array("h", chunk[: len(chunk) - len(chunk) % 2])
+    elif sample_width == 1:
+        samples = array.array("b", bytes((b - 128) & 0xFF for b in chunk))
+    elif sample_width == 3:
+        usable = len(chunk) - len(chunk) % 3
+        samples = [int.from_bytes(chunk[i:i + 3], "little", signed=True) for i in range(0, usable, 3)]
+    else:
+        samples = array.array("i", chunk[: len(chunk) - len(chunk) % 4])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class EnergyVAD:
+    """Energy-threshold segmenter, calibrated once from ambient noise."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        sample_width: int,
+        chunk_frames: int = CHUNK_FRAMES,
+        threshold_ratio: float = 2.5,
+        min_threshold: float = 300.0,
+        pause_seconds: float = 0.8,
+        preroll_seconds: float = 0.3,
+        max_seconds: float = 30.0,
+    ):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+        self.threshold = min_threshold
+        seconds_per_chunk = chunk_frames / sample_rate
+        self.pause_chunks = max(1, int(pause_seconds / seconds_per_chunk))
+        self.max_chunks = max(1, int(max_seconds / seconds_per_chunk))
+        self._preroll = deque(maxlen=max(1, int(preroll_seconds / seconds_per_chunk)))
+        self._voiced: list[bytes] = []
+        self._silent_run = 0
+        self._started_at = 0.0
+
+    def calibrate(self, chunks: list[bytes]) -> float:
+        if chunks:
+            noise = sum(rms(c, self.sample_width) for c in chunks) / len(chunks)
+            self.threshold = max(noise * self.threshold_ratio, self.min_threshold)
+        return self.threshold
+
+    def feed(self, chunk: bytes) -> Utterance | None:
+        """Consume one chunk; returns an Utterance when a segment of speech ends."""
+        loud = rms(chunk, self.sample_width) >= self.threshold
+        if not self._voiced:
+            if loud:
+                self._started_at = time.perf_counter()
+                self._voiced = [*self._preroll, chunk]
+                self._silent_run = 0
+            else:
+                self._preroll.append(chunk)
+            return None
+
+        self._voiced.append(chunk)
+        self._silent_run = 0 if loud else self._silent_run + 1
+        if self._silent_run >= self.pause_chunks or len(self._voiced) >= self.max_chunks:
+            return self.flush()
+        return None
+
+    def flush(self) -> Utterance | None:
+        if not self._voiced:
+            return None
+        utterance = Utterance(
+            audio=b"".join(self._voiced),
+            sample_rate=self.sample_rate,
+            sample_width=self.sample_width,
+            started_at=self._started_at,
+            ended_at=time.perf_counter(),
+        )
+        self._voiced = []
+        self._preroll.clear()
+        self._silent_run = 0
+        return utterance
+
+
+class BackgroundListener:
+    """
+    Captures audio on one thread and recognizes on another, so the next
+    utterance is recorded while the previous one is transcribed and the
+    agent is working. Calibration happens once, when the listener starts.
+    """
+
+    def __init__(self, source=None, recognizer=None, calibration_seconds: float = 1.0, **vad_options):
+        self.source = source or MicrophoneSource()
+        self.recognizer = recognizer or GoogleRecognizer()
+        self.calibration_seconds = calibration_seconds
+        self.vad_options = vad_options
+        self.utterances: queue.Queue[Utterance | None] = queue.Queue(maxsize=16)
+        self.transcripts: queue.Queue[Transcript | None] = queue.Queue()
+        self.calibrated = threading.Event()
+        self.finished = threading.Event()
+        self._paused = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> "BackgroundListener":
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="voice-capture", daemon=True),
+            threading.Thread(target=self._recognize_loop, name="voice-recognize", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def pause(self) -> None:
+        """Drop captured audio (e.g. while the assistant itself is speaking)."""
+        self._paused.set()
+
+    def resume(self) -> None:
+        self._paused.clear()
+
+    def get(self, timeout: float | None = None) -> Transcript | None:
+        """Next transcript, or None on timeout / when the source is exhausted."""
+        try:
+            return self.transcripts.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _capture_loop(self) -> None:
+        try:
+            with self.source as src:
+                chunk_frames = getattr(src, "chunk_frames", CHUNK_FRAMES)
+                vad = EnergyVAD(src.sample_rate, src.sample_width, chunk_frames, **self.vad_options)
+                calibration = []
+                needed = int(self.calibration_seconds * src.sample_rate / chunk_frames)
+                while len(calibration) < needed and not self._stop.is_set():
+                    chunk = src.read()
+                    if not chunk:
+                        break
+                    calibration.append(chunk)
+                vad.calibrate(calibration)
+                self.calibrated.set()
+
+                while not self._stop.is_set():
+                    chunk = src.read()
+                    if not chunk:
+                        break
+                    if self._paused.is_set():
+                        vad.flush()
+                        continue
+                    utterance = vad.feed(chunk)
+                    if utterance is not None:
+                        self.utterances.put(utterance)
+                tail = vad.flush()
+                if tail is not None:
+                    self.utterances.put(tail)
+        except Exception as e:
+            self.transcripts.put(Transcript(text=None, error=e, stage="capture"))
+        finally:
+            self.calibrated.set()
+            self.utterances.put(None)
+
+    def _recognize_loop(self) -> None:
+        while True:
+            utterance = self.utterances.get()
+            if utterance is None:
+                break
+            try:
+                text, error = self.recognizer.recognize(utterance), None
+            except Exception as e:
+                text, error = None, e
+            self.transcripts.put(
+                Transcript(
+                    text=text,
+                    error=error,
+                    utterance_ended_at=utterance.ended_at,
+                    recognized_at=time.perf_counter(),
+                )
+            )
+        self.finished.set()
+        self.transcripts.put(None)
+
+
+def benchmark(path: str, realtime: bool = False) -> list[Transcript]:
+    """Run the capture pipeline over a WAV file with a no-op recognizer and report segments."""
+    class LengthRecognizer:
+        def recognize(self, u: Utterance) -> str:
+            seconds = len(u.audio) / (u.sample_rate * u.sample_width)
+            return f"<{seconds:.2f}s of speech>"
+
+    started = time.perf_counter()
+    listener = BackgroundListener(WavFileSource(path, realtime=realtime), LengthRecognizer()).start()
+    results = []
+    while (t := listener.get(timeout=60)) is not None:
+        results.append(t)
+    elapsed = time.perf_counter() - started
+    for t in results:
+        print(f"{t.text or t.error}  (recognized {t.latency * 1000:.1f} ms after end of speech)")
+    print(f"{len(results)} utterance(s) in {elapsed:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1], realtime="--realtime" in sys.argv)
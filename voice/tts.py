@@ -0,0 +1,187 @@
+import io
+import re
+import threading
+import time
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+
+SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+def split_sentences(text: str, min_chars: int = 20) -> list[str]:
+    """Split text into speakable chunks, merging very short fragments into the next one."""
+    chunks = []
+    buffer = ""
+    for part in SENTENCE_END.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        buffer = f"{buffer} {part}".strip()
+        if len(buffer) >= min_chars:
+            chunks.append(buffer)
+            buffer = ""
+    if buffer:
+        chunks.append(buffer)
+    return chunks
+
+
+# --- Synthesizers: text -> audio bytes ---
+class GTTSSynthesizer:
+    """Google TTS, written to an in-memory MP3 buffer instead of a file."""
+    format = "mp3"
+
+    def __init__(self, lang: str = "en"):
+        self.lang = lang
+
+    def synthesize(self, text: str) -> bytes:
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=self.lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class SilentSynthesizer:
+    """Offline stand-in: silent WAV whose length scales with the text. Useful for tests and benchmarks."""
+    format = "wav"
+
+    def __init__(self, seconds_per_char: float = 0.01, delay: float = 0.0, rate: int = 8000):
+        self.seconds_per_char = seconds_per_char
+        self.delay = delay
+        self.rate = rate
+
+    def synthesize(self, text: str) -> bytes:
+        if self.delay:
+            time.sleep(self.delay)
+        frames = int(self.rate * self.seconds_per_char * len(text))
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(self.rate)
+            w.writeframes(b"\x80" * frames)
+        return buffer.getvalue()
+
+
+# --- Players: audio bytes -> speakers ---
+class PygamePlayer:
+    """Plays in-memory audio through pygame, keeping the mixer open between calls."""
+
+    def __init__(self):
+        import pygame
+        self.pygame = pygame
+        self._ready = False
+
+    def play(self, audio: bytes, fmt: str) -> None:
+        pygame = self.pygame
+        if not self._ready:
+            pygame.mixer.init()
+            self._ready = True
+        pygame.mixer.music.load(io.BytesIO(audio), fmt)
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            time.sleep(0.05)
+
+    def close(self) -> None:
+        if self._ready:
+            self.pygame.mixer.quit()
+            self._ready = False
+
+
+class NullPlayer:
+    """Discards audio (optionally sleeping for its WAV duration); records what was played."""
+
+    def __init__(self, realtime: bool = False):
+        self.realtime = realtime
+        self.played: list[bytes] = []
+
+    def play(self, audio: bytes, fmt: str) -> None:
+        self.played.append(audio)
+        if self.realtime and fmt == "wav":
+            with wave.open(io.BytesIO(audio)) as w:
+                time.sleep(w.getnframes() / w.getframerate())
+
+    def close(self) -> None:
+        pass
+
+
+class SpeechPipeline:
+    """
+    Sentence-level TTS pipeline.
+
+    Replies are split into sentences and submitted for synthesis up front;
+    sentence N+1 is synthesized while sentence N plays, so the first audio
+    starts as soon as the first sentence is ready. Audio stays in memory and
+    common phrases are served from a cache. Prewarming runs on its own
+    single worker so it never queues ahead of a reply being spoken.
+    """
+
+    def __init__(self, synthesizer=None, player=None, workers: int = 2, cache_size: int = 64):
+        self.synthesizer = synthesizer or GTTSSynthesizer()
+        self.player = player or PygamePlayer()
+        self.cache_size = cache_size
+        self.last_time_to_first_audio: float | None = None
+        self._cache: dict[str, bytes] = {}
+        self._cache_lock = threading.Lock()
+        self._warming: dict[str, Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._warm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-warm")
+
+    def _synthesize(self, text: str) -> bytes:
+        with self._cache_lock:
+            cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+        return self.synthesizer.synthesize(text)
+
+    def cache_phrase(self, text: str) -> bytes:
+        """Synthesize and keep a phrase for instant playback later."""
+        audio = self.synthesizer.synthesize(text)
+        with self._cache_lock:
+            if len(self._cache) >= self.cache_size:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[text] = audio
+        return audio
+
+    def prewarm(self, phrases: list[str]) -> None:
+        """Cache phrases in the background (e.g. thinking lines, welcome and goodbye)."""
+        for phrase in phrases:
+            with self._cache_lock:
+                if phrase in self._cache or phrase in self._warming:
+                    continue
+                future = self._warming[phrase] = self._warm_pool.submit(self._safe_cache, phrase)
+            future.add_done_callback(lambda _, phrase=phrase: self._done_warming(phrase))
+
+    def _done_warming(self, phrase: str) -> None:
+        with self._cache_lock:
+            self._warming.pop(phrase, None)
+
+    def _safe_cache(self, phrase: str) -> bytes | None:
+        try:
+            return self.cache_phrase(phrase)
+        except Exception:
+            return None  # Prewarming is best-effort; speak() will synthesize on demand
+
+    def speak(self, text: str) -> None:
+        """Speak text, blocking until playback ends."""
+        started = time.perf_counter()
+        self.last_time_to_first_audio = None
+        with self._cache_lock:
+            whole = self._cache.get(text)
+            warming = self._warming.get(text)
+        if whole is None and warming is not None and not warming.cancel():
+            # Prewarm has started on it: waiting beats synthesizing the phrase twice (a queued job is cancelled)
+            whole = warming.result()
+        if whole is not None:
+            parts = [whole]
+        else:
+            parts = [self._pool.submit(self._synthesize, chunk) for chunk in split_sentences(text)]
+        for part in parts:
+            audio = part if isinstance(part, bytes) else part.result()
+            if self.last_time_to_first_audio is None:
+                self.last_time_to_first_audio = time.perf_counter() - started
+            self.player.play(audio, self.synthesizer.format)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._warm_pool.shutdown(wait=False, cancel_futures=True)
+        self.player.close()